@@ -1,15 +1,21 @@
+import argparse
 import asyncio
 import json
 import logging
 import os
+import sys
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 from tqdm import tqdm
 
 import mcp.types as types
 import openai
 
+from baseline.mcp_copilot.embedding import EmbeddingProvider, provider_from_env
+from baseline.mcp_copilot.index_store import content_hash, indexed_server_hashes
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -37,7 +43,12 @@ class McpArgGenerator:
         self,
         config: List[Dict[str, Any]] | Path,
         output_file: str | Path,
+        embedding_provider: EmbeddingProvider | None = None,
+        embedding_batch_size: int = 64,
+        checkpoint_interval: float = 30.0,
     ):
+        self.embedding_batch_size = embedding_batch_size
+        self.checkpoint_interval = checkpoint_interval
         self.output_file = Path(output_file)
 
         if isinstance(config, List):
@@ -49,29 +60,44 @@ class McpArgGenerator:
                 self.config = json.load(f)
         else:
             raise TypeError("Config must be a dictionary or a Path to a JSON file.")
-        self.embedding_client = openai.AsyncOpenAI(
+        self.embedding_provider = embedding_provider or provider_from_env(
             api_key=embedding_api_key, base_url=embedding_api_url
         )
-        self.summary_client = openai.AsyncOpenAI(
-            api_key=abstract_api_key, base_url=abstract_api_url
-        )
-
-    async def _get_embedding(
-        self, text: str, model: str = embedding_model
-    ) -> List[float]:
-        if not text:
+        try:
+            self.summary_client = openai.AsyncOpenAI(
+                api_key=abstract_api_key, base_url=abstract_api_url
+            )
+        except openai.OpenAIError as e:
+            # Offline indexing: use the server description as its summary.
+            logger.warning(f"No summary model configured ({e}), skipping summaries.")
+            self.summary_client = None
+
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in one batch; empty texts and failures yield empty lists."""
+        embeddings = [[] for _ in texts]
+        batch = [i for i, text in enumerate(texts) if text]
+        if len(batch) < len(texts):
             logger.warning("Empty text provided for embedding, returning empty list.")
-            return []
+        if not batch:
+            return embeddings
+        chunks = [
+            [texts[i] for i in batch[start : start + self.embedding_batch_size]]
+            for start in range(0, len(batch), self.embedding_batch_size)
+        ]
         try:
-            response = await self.embedding_client.embeddings.create(
-                model=model,
-                input=[text],
-                encoding_format="float",
+            results = await asyncio.gather(
+                *(self.embedding_provider.aembed(chunk) for chunk in chunks)
             )
-            return response.data[0].embedding
+            vectors = [vector for result in results for vector in result]
         except Exception as e:
             logger.error(f"Embedding Error: {e}")
-            return []
+            return embeddings
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+        return embeddings
+
+    async def _get_embedding(self, text: str) -> List[float]:
+        return (await self._get_embeddings([text]))[0]
 
     async def _generate_summary(
         self,
@@ -80,6 +106,8 @@ class McpArgGenerator:
         tools: List[types.Tool],
         model: str = abstract_model,
     ) -> str:
+        if self.summary_client is None:
+            return server_desc
         tool_descriptions = "\n".join(
             [f"- {tool.name}: {tool.description}" for tool in tools]
         )
@@ -132,112 +160,310 @@ Please return only the generated summary text, without any additional titles or
                 formatted_params[param_name] = f"({param_type}) {param_desc}"
         return formatted_params
 
-    async def generate(self) -> None:
-        existing_servers_info = []
-        existing_server_names = set()
-
-        if self.output_file.exists():
-            try:
-                with open(self.output_file, "r", encoding="utf-8") as f:
-                    content = json.load(f)
-                    if isinstance(content, list):
-                        existing_servers_info = content
-                        for server_data in existing_servers_info:
-                            if "server_name" in server_data:
-                                existing_server_names.add(server_data["server_name"])
-                        logger.info(
-                            f"loaded {len(existing_server_names)} existing server from {self.output_file}."
-                        )
-                    else:
-                        logger.warning(
-                            f"{self.output_file} does not contain a valid list of servers. "
-                        )
-            except (json.JSONDecodeError, IOError) as e:
-                logger.error(
-                    f"Error reading existing servers from {self.output_file}: {e}"
-                )
-
-        all_servers_info = existing_servers_info.copy()
-        new_servers_processed_count = 0
-
-        for server in tqdm(self.config):
-            server_config = server["config"]["mcpServers"]
-            server_name = list(server_config.keys())[0]
-            if server_name in existing_server_names:
-                continue
+    def _config_servers(self) -> List[Dict[str, Any]]:
+        """Servers of the crawl config with the content hashes of the index."""
+        servers = []
+        for server in self.config:
+            server_name = list(server["config"]["mcpServers"].keys())[0]
             tools = [
                 types.Tool(**tool)
                 for tool in server["tools"].get(server_name, {}).get("tools", [])
             ]
-            server_description = server["description"]
-            logger.info(f"Indexing server: {server_name}")
-            try:
-                server_summary = await self._generate_summary(
-                    server_name, server_description, tools
+            tool_hashes = [
+                content_hash(
+                    {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "inputSchema": tool.inputSchema,
+                    }
                 )
-                embedding_tasks = {
-                    "server_desc": self._get_embedding(server_description),
-                    "server_summary": self._get_embedding(server_summary),
-                }
-                for i, tool in enumerate(tools):
-                    embedding_tasks[f"tool_{i}"] = self._get_embedding(tool.description)
-
-                embeddings_results = await asyncio.gather(*embedding_tasks.values())
-                embeddings = dict(zip(embedding_tasks.keys(), embeddings_results))
-
-                formatted_tools = []
-                for i, tool in enumerate(tools):
-                    formatted_tools.append(
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "description_embedding": embeddings.get(f"tool_{i}", []),
-                            "parameter": self._format_tool_parameters(tool),
-                        }
-                    )
-
-                server_output = {
+                for tool in tools
+            ]
+            servers.append(
+                {
                     "server_name": server_name,
-                    "server_summary": server_summary,
-                    "server_description": server_description,
-                    "description_embedding": embeddings.get("server_desc", []),
-                    "summary_embedding": embeddings.get("server_summary", []),
-                    "tools": formatted_tools,
+                    "server_description": server["description"],
+                    "tools": tools,
+                    "tool_hashes": tool_hashes,
+                    "content_hash": content_hash(
+                        {"description": server["description"], "tools": tool_hashes}
+                    ),
                 }
+            )
+        return servers
 
-                all_servers_info.append(server_output)
+    def _load_existing(self) -> Dict[str, Dict[str, Any]]:
+        if not self.output_file.exists():
+            return {}
+        try:
+            with open(self.output_file, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Error reading existing servers from {self.output_file}: {e}")
+            return {}
+        if not isinstance(content, list):
+            logger.warning(
+                f"{self.output_file} does not contain a valid list of servers. "
+            )
+            return {}
+        existing = {
+            server_data["server_name"]: server_data
+            for server_data in content
+            if "server_name" in server_data
+        }
+        logger.info(f"loaded {len(existing)} existing server from {self.output_file}.")
+        return existing
+
+    def _write(self, servers_info: List[Dict[str, Any]]) -> None:
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_file.with_name(
+            f".{self.output_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(servers_info, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.output_file)
+
+    async def _index_server(
+        self, server: Dict[str, Any], old: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the index entry of a server, reusing what did not change.
+
+        ``old`` is the previous entry of the server (empty for a new one). The
+        summary is only regenerated when the description or the tool list
+        changed, and only texts without a stored embedding are embedded.
+        """
+        server_name = server["server_name"]
+        server_description = server["server_description"]
+        tools = server["tools"]
+        old_tools = old.get("tools") or []
+
+        old_tool_texts = [
+            (tool.get("name"), tool.get("description")) for tool in old_tools
+        ]
+        new_tool_texts = [(tool.name, tool.description) for tool in tools]
+        summary_inputs_changed = (
+            old.get("server_description") != server_description
+            or old_tool_texts != new_tool_texts
+        )
+        server_summary = old.get("server_summary")
+        if (
+            summary_inputs_changed
+            or not server_summary
+            or server_summary == f"Error generating summary for {server_name}"
+        ):
+            server_summary = await self._generate_summary(
+                server_name, server_description, tools
+            )
 
-                try:
-                    self.output_file.parent.mkdir(parents=True, exist_ok=True)
-                    with open(self.output_file, "w", encoding="utf-8") as f:
-                        json.dump(all_servers_info, f, indent=2, ensure_ascii=False)
-                    new_servers_processed_count += 1
-                except IOError as e:
-                    logger.error(
-                        f"Error writing to output file {self.output_file}: {e}"
-                    )
+        known = {
+            tool.get("description"): tool["description_embedding"]
+            for tool in old_tools
+            if tool.get("description_embedding")
+        }
+        if old.get("server_description") == server_description and old.get(
+            "description_embedding"
+        ):
+            known[server_description] = old["description_embedding"]
+        reuse_summary = (
+            old.get("server_summary") == server_summary and old.get("summary_embedding")
+        )
+        missing = [
+            text
+            for text in dict.fromkeys(
+                [server_description] + [tool.description for tool in tools]
+            )
+            if text not in known
+        ]
+        if not reuse_summary:
+            missing.append(server_summary)
+        embedded = dict(zip(missing, await self._get_embeddings(missing)))
+        known.update({text: vector for text, vector in embedded.items() if text})
+
+        formatted_tools = []
+        for tool, tool_hash in zip(tools, server["tool_hashes"]):
+            formatted_tools.append(
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "description_embedding": known.get(tool.description, []),
+                    "parameter": self._format_tool_parameters(tool),
+                    "content_hash": tool_hash,
+                }
+            )
+
+        return {
+            "server_name": server_name,
+            "server_summary": server_summary,
+            "server_description": server_description,
+            "description_embedding": known.get(server_description, []),
+            "summary_embedding": (
+                old["summary_embedding"]
+                if reuse_summary
+                else embedded.get(server_summary, [])
+            ),
+            "tools": formatted_tools,
+            "content_hash": server["content_hash"],
+        }
+
+    @property
+    def skipped_file(self) -> Path:
+        return Path(f"{self.output_file}.skipped.json")
+
+    def _load_skipped(self) -> Dict[str, Dict[str, str]]:
+        """Servers left as they are by an earlier run, by name.
+
+        Each maps to the content hash it was skipped at and the reason:
+        ``kept`` (no tools crawled, the indexed ones were kept) or
+        ``failed`` (summarizing or embedding raised).
+        """
+        try:
+            with open(self.skipped_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_skipped(self, skipped: Dict[str, Dict[str, str]]) -> None:
+        if not skipped:
+            self.skipped_file.unlink(missing_ok=True)
+            return
+        tmp_path = self.skipped_file.with_name(
+            f".{self.skipped_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(skipped, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.skipped_file)
+
+    async def generate(self, retry_failed: bool = True) -> Dict[str, List[str]]:
+        """Bring the index in line with the crawl config.
+
+        New servers are indexed, servers whose content hash changed are
+        re-indexed reusing unchanged summaries and embeddings, and servers no
+        longer in the config are pruned. Returns the names of the added,
+        updated and removed servers, and of servers that failed to index.
+
+        Servers skipped by an earlier run at the same content hash are not
+        tried again, except failed ones when ``retry_failed`` is set.
+        """
+        config_servers = self._config_servers()
+        changes = {"added": [], "updated": [], "removed": [], "failed": []}
+        skipped = self._load_skipped()
+
+        def settled(name: str, current_hash: str) -> bool:
+            entry = skipped.get(name)
+            return (
+                entry is not None
+                and entry["content_hash"] == current_hash
+                and (entry["reason"] == "kept" or not retry_failed)
+            )
 
+        # Every copilot runs this on startup; when nothing changed, compare
+        # against the compiled index instead of parsing all embeddings.
+        if self.output_file.exists():
+            try:
+                indexed = indexed_server_hashes(self.output_file)
+            except (json.JSONDecodeError, IOError, KeyError):
+                indexed = {}
+            current = {
+                server["server_name"]: server["content_hash"]
+                for server in config_servers
+            }
+            if indexed.keys() <= current.keys() and all(
+                indexed.get(name) == current_hash or settled(name, current_hash)
+                for name, current_hash in current.items()
+            ):
+                logger.info(f"All servers are up to date in {self.output_file}.")
+                return changes
+
+        existing = self._load_existing()
+        config_names = {server["server_name"] for server in config_servers}
+        changes["removed"] = [name for name in existing if name not in config_names]
+        for name in changes["removed"]:
+            logger.info(f"Removing server: {name}")
+            existing.pop(name)
+
+        def ordered() -> List[Dict[str, Any]]:
+            return [
+                existing[server["server_name"]]
+                for server in config_servers
+                if server["server_name"] in existing
+            ]
+
+        last_write = time.monotonic()
+        for server in tqdm(config_servers):
+            server_name = server["server_name"]
+            old = existing.get(server_name, {})
+            if old and old.get("content_hash") == server["content_hash"]:
+                skipped.pop(server_name, None)
+                continue
+            if settled(server_name, server["content_hash"]):
+                continue
+            skip = {"content_hash": server["content_hash"]}
+            if old.get("tools") and not server["tools"]:
+                logger.warning(
+                    f"No tools crawled for '{server_name}', keeping the indexed ones."
+                )
+                skipped[server_name] = {**skip, "reason": "kept"}
+                continue
+            logger.info(f"Indexing server: {server_name}")
+            try:
+                existing[server_name] = await self._index_server(server, old)
             except Exception as e:
                 logger.error(f"Error processing server '{server_name}': {e}")
+                changes["failed"].append(server_name)
+                skipped[server_name] = {**skip, "reason": "failed"}
                 continue
-        logger.info("Indexing completed.")
-        if new_servers_processed_count > 0:
-            logger.info(
-                f"Add {new_servers_processed_count} new servers to {self.output_file}."
-            )
-        else:
-            logger.info("No new servers were added.")
+            skipped.pop(server_name, None)
+            changes["updated" if old else "added"].append(server_name)
+            # Checkpoint periodically so an interrupted run keeps its progress
+            if time.monotonic() - last_write > self.checkpoint_interval:
+                self._write(ordered())
+                last_write = time.monotonic()
+
+        for name in list(skipped):
+            if name not in config_names:
+                skipped.pop(name)
+        if changes["added"] or changes["updated"] or changes["removed"]:
+            try:
+                self._write(ordered())
+            except IOError as e:
+                logger.error(f"Error writing to output file {self.output_file}: {e}")
+                raise
+        self._write_skipped(skipped)
+        logger.info(
+            f"Indexing completed: {len(changes['added'])} added, "
+            f"{len(changes['updated'])} updated, {len(changes['removed'])} removed, "
+            f"{len(changes['failed'])} failed in {self.output_file}."
+        )
+        return changes
 
 
-async def run_generation():
+async def run_generation(
+    config_path: Path = DEFAULT_CONFIG_PATH,
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    retry_failed: bool = True,
+) -> Optional[Dict[str, List[str]]]:
+    """Run the generator; returns its changes, or None when it could not run."""
     try:
-        generator = McpArgGenerator(
-            config=DEFAULT_CONFIG_PATH, output_file=DEFAULT_OUTPUT_PATH
-        )
-        await generator.generate()
+        generator = McpArgGenerator(config=config_path, output_file=output_path)
     except (FileNotFoundError, ValueError, TypeError) as e:
         logger.error(f"Error initializing McpArgGenerator: {e}")
+        return None
+    try:
+        return await generator.generate(retry_failed)
+    except (OSError, ValueError, TypeError) as e:
+        logger.error(f"Error generating {output_path}: {e}")
+        return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Summarize and embed the servers")
+    parser.add_argument("--config_path", type=Path, default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--output_path", type=Path, default=DEFAULT_OUTPUT_PATH)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(run_generation())
+    args = get_args()
+    changes = asyncio.run(run_generation(args.config_path, args.output_path))
+    # 1: could not run, 2: some servers failed and will be retried next run
+    sys.exit(1 if changes is None else 2 if changes["failed"] else 0)
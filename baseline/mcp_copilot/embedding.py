@@ -0,0 +1,209 @@
+"""Embedding providers for tool routing and indexing.
+
+``ToolMatcher`` and ``McpArgGenerator`` embed text through an
+``EmbeddingProvider`` so the copilot can run against an OpenAI-compatible
+endpoint or fully offline:
+
+- ``openai``: remote endpoint configured by ``EMBEDDING_BASE_URL``.
+- ``sentence-transformers``: a local model (``EMBEDDING_MODEL`` is a model
+  name or path) loaded once per process and shared by all providers.
+- ``hashing``: a deterministic feature-hashing vectorizer with no model at
+  all, meant for tests and CI.
+
+The provider is selected with ``EMBEDDING_PROVIDER`` (default ``openai``).
+Vectors of an index must come from the same provider and model as the
+queries, so rebuild the index after switching.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
+
+from baseline.mcp_copilot.lexical import tokenize
+
+
+class EmbeddingProvider:
+    """Batched text embedding."""
+
+    name = "base"
+    # Whether the provider needs EMBEDDING_BASE_URL / EMBEDDING_API_KEY
+    remote = False
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed ``texts`` in one batch, preserving their order."""
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        # Local models are CPU bound; keep them off the event loop.
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI-compatible embeddings endpoint."""
+
+    name = "openai"
+    remote = True
+
+    def __init__(
+        self,
+        model: str,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.client = OpenAI(base_url=base_url, api_key=api_key)
+        self.async_client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(0.05)
+        response = self.client.embeddings.create(
+            input=texts,
+            model=self.model,
+            # dimensions=self.dimensions,
+            encoding_format="float",
+            timeout=self.timeout,
+        )
+        data = sorted(response.data, key=lambda x: x.index)
+        return [item.embedding for item in data]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.async_client.embeddings.create(
+            input=texts,
+            model=self.model,
+            encoding_format="float",
+            timeout=self.timeout,
+        )
+        data = sorted(response.data, key=lambda x: x.index)
+        return [item.embedding for item in data]
+
+    async def aclose(self) -> None:
+        await self.async_client.close()
+
+
+_MODELS: Dict[Any, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """Local sentence-transformers model, loaded once and kept warm."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str, device: str = "cpu", batch_size: int = 32):
+        self.model_name = model
+        self.device = device
+        self.batch_size = batch_size
+        self.model = self._load(model, device)
+
+    @staticmethod
+    def _load(model: str, device: str):
+        with _MODELS_LOCK:
+            if (model, device) not in _MODELS:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise ImportError(
+                        "The sentence-transformers embedding provider requires "
+                        "`uv pip install sentence-transformers`."
+                    ) from e
+                _MODELS[(model, device)] = SentenceTransformer(model, device=device)
+            return _MODELS[(model, device)]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32).tolist()
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Signed feature hashing of word unigrams and bigrams.
+
+    Deterministic and dependency free; texts sharing words get similar
+    vectors, which is enough to exercise routing end to end without a model.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[i, (value >> 1) % self.dimensions] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (vectors / norms).tolist()
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    SentenceTransformerProvider.name: SentenceTransformerProvider,
+    HashingEmbeddingProvider.name: HashingEmbeddingProvider,
+}
+
+
+def get_provider(name: str = "openai", **kwargs) -> EmbeddingProvider:
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown embedding provider '{name}', expected one of {list(PROVIDERS)}."
+        )
+    return PROVIDERS[name](**kwargs)
+
+
+def provider_from_env(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> EmbeddingProvider:
+    """Build the provider selected by ``EMBEDDING_PROVIDER``.
+
+    ``api_key`` and ``base_url`` default to ``EMBEDDING_API_KEY`` and
+    ``EMBEDDING_BASE_URL`` and are only used by the remote provider.
+    """
+    name = os.getenv("EMBEDDING_PROVIDER") or "openai"
+    model = os.getenv("EMBEDDING_MODEL")
+    if name == OpenAIEmbeddingProvider.name:
+        api_key = api_key or os.getenv("EMBEDDING_API_KEY")
+        if not api_key:
+            raise ValueError("EMBEDDING_API_KEY environment variable not set.")
+        return OpenAIEmbeddingProvider(
+            model=model,
+            base_url=base_url or os.getenv("EMBEDDING_BASE_URL"),
+            api_key=api_key,
+            timeout=timeout,
+        )
+    if name == SentenceTransformerProvider.name:
+        return SentenceTransformerProvider(
+            model=model, device=os.getenv("EMBEDDING_DEVICE") or "cpu"
+        )
+    return get_provider(
+        name, dimensions=int(os.getenv("EMBEDDING_DIMENSIONS", "1024"))
+    )
@@ -0,0 +1,328 @@
+"""Health and latency of the configured MCP servers.
+
+A probe connects to a server the same way ``Router.call_tool`` does and
+records how long ``initialize`` and ``list_tools`` took, or why they failed.
+Results are kept in a ``HealthTable`` persisted as JSON, which the router
+uses to fail fast on servers that are currently broken and to rank them
+last in route results, instead of waiting out the tool call timeout.
+The router also records every ``execute-tool`` call, counting a connection
+error or a call that times out as a failed check, and saves the table when
+it shuts down.
+
+A server is:
+
+- ``unhealthy`` when its last ``fail_threshold`` checks failed (2 by default,
+  so a single transient failure does not count),
+- ``slow`` when initialize + list_tools took longer than ``slow_ms``,
+- ``healthy`` otherwise, and ``unknown`` when it has not been checked
+  within ``max_age`` seconds.
+
+Failing fast is opt-in. Once an unhealthy server's ``retry_after`` cooldown
+has passed, one call is let through again (half-open), so a server that
+recovered is marked healthy by its next successful connection.
+
+Usage:
+    python -m baseline.mcp_copilot.health --config ./baseline/mcp_copilot/config/clean_config.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from tabulate import tabulate
+
+from baseline.mcp_copilot.mcp_connection import PHASES, MCPConnection
+from baseline.mcp_copilot.schemas import Server, ServerConfig
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+SLOW = "slow"
+UNHEALTHY = "unhealthy"
+UNKNOWN = "unknown"
+# Order of servers with these statuses in route results
+STATUS_RANK = {HEALTHY: 0, UNKNOWN: 0, SLOW: 1, UNHEALTHY: 2}
+
+DEFAULT_HEALTH_PATH = Path(__file__).resolve().parent / "config" / "server_health.json"
+
+
+@dataclass
+class ServerHealth:
+    name: str
+    ok: bool = False
+    initialize_ms: float | None = None
+    list_tools_ms: float | None = None
+    tool_count: int = 0
+    error: str | None = None
+    checked_at: float = 0.0
+    consecutive_failures: int = 0
+
+
+class HealthTable:
+    """Latest health check of every server, persisted as JSON."""
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        fail_threshold: int = 2,
+        slow_ms: float = 10000.0,
+        max_age: float = 3600.0,
+        retry_after: float = 60.0,
+    ):
+        self.path = Path(path) if path else None
+        self.fail_threshold = fail_threshold
+        self.slow_ms = slow_ms
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self.entries: dict[str, ServerHealth] = {}
+        # Whether record() added checks that are not saved yet
+        self.dirty = False
+        # When a trial call was last let through to an unhealthy server
+        self._trials: dict[str, float] = {}
+        self._mtime: int | None = None
+        # Bumped whenever the status of a server changes
+        self.version = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Merge in checks written to the file by other processes."""
+        if self.path is None:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read health table {self.path}: {e}")
+            return
+        self._mtime = mtime
+        for name, entry in data.items():
+            current = self.entries.get(name)
+            if current is None or entry.get("checked_at", 0) > current.checked_at:
+                self._set(ServerHealth(**entry))
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {name: asdict(entry) for name, entry in sorted(self.entries.items())},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self.dirty = False
+
+    def _set(self, entry: ServerHealth) -> None:
+        before = self.status(entry.name)
+        self.entries[entry.name] = entry
+        if self.status(entry.name) != before:
+            self.version += 1
+
+    def record(
+        self,
+        name: str,
+        ok: bool,
+        timings: dict[str, float] | None = None,
+        tool_count: int = 0,
+        error: str | None = None,
+    ) -> ServerHealth:
+        previous = self.entries.get(name)
+        failures = 0 if ok else (previous.consecutive_failures if previous else 0) + 1
+        timings = timings or {}
+        # Everything up to a ready session counts as initialize
+        connect = [timings[phase] for phase in PHASES[:3] if phase in timings]
+        entry = ServerHealth(
+            name=name,
+            ok=ok,
+            initialize_ms=sum(connect) if connect else None,
+            list_tools_ms=timings.get("list_tools"),
+            tool_count=tool_count,
+            error=error,
+            checked_at=time.time(),
+            consecutive_failures=failures,
+        )
+        self._set(entry)
+        self.dirty = True
+        return entry
+
+    def status(self, name: str) -> str:
+        entry = self.entries.get(name)
+        if entry is None or time.time() - entry.checked_at > self.max_age:
+            return UNKNOWN
+        if not entry.ok:
+            return (
+                UNHEALTHY
+                if entry.consecutive_failures >= self.fail_threshold
+                else UNKNOWN
+            )
+        latency = (entry.initialize_ms or 0) + (entry.list_tools_ms or 0)
+        return SLOW if latency > self.slow_ms else HEALTHY
+
+    def allow_call(self, name: str) -> bool:
+        """False while an unhealthy server is cooling down.
+
+        After ``retry_after`` seconds since its last failure, a single trial
+        call is allowed; further calls wait for its outcome or the next
+        cooldown.
+        """
+        if self.status(name) != UNHEALTHY:
+            return True
+        now = time.time()
+        last = max(self.entries[name].checked_at, self._trials.get(name, 0.0))
+        if now - last < self.retry_after:
+            return False
+        self._trials[name] = now
+        return True
+
+    def rank(self, name: str) -> int:
+        return STATUS_RANK[self.status(name)]
+
+    def rows(self) -> list[list[Any]]:
+        def fmt(ms: float | None) -> str:
+            return "" if ms is None else f"{ms:.0f}"
+
+        entries = sorted(
+            self.entries.values(),
+            key=lambda e: (
+                self.rank(e.name),
+                (e.initialize_ms or 0) + (e.list_tools_ms or 0),
+            ),
+        )
+        return [
+            [
+                entry.name,
+                self.status(entry.name),
+                fmt(entry.initialize_ms),
+                fmt(entry.list_tools_ms),
+                entry.tool_count,
+                entry.consecutive_failures,
+                (entry.error or "")[:60],
+            ]
+            for entry in entries
+        ]
+
+    def format(self) -> str:
+        return tabulate(
+            self.rows(),
+            headers=[
+                "server",
+                "status",
+                "initialize ms",
+                "list_tools ms",
+                "tools",
+                "failures",
+                "error",
+            ],
+        )
+
+
+async def probe_server(
+    table: HealthTable, server: Server, timeout: float = 60.0
+) -> ServerHealth:
+    """Connect to ``server`` once and record the outcome in ``table``."""
+    # Probe a copy; MCPConnection writes env and tools back into the server
+    connection = MCPConnection(server.model_copy(deep=True))
+    try:
+        async with asyncio.timeout(timeout):
+            await connection.connect()
+    except TimeoutError:
+        return table.record(server.name, False, error=f"timed out after {timeout}s")
+    except Exception as e:
+        return table.record(server.name, False, error=str(e) or type(e).__name__)
+    finally:
+        await connection.aclose()
+    return table.record(
+        server.name,
+        True,
+        timings=connection.timings,
+        tool_count=len(connection.server.tools or []),
+    )
+
+
+async def probe_servers(
+    table: HealthTable,
+    servers: dict[str, Server],
+    timeout: float = 60.0,
+    concurrency: int = 4,
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(server: Server) -> None:
+        async with semaphore:
+            entry = await probe_server(table, server, timeout)
+        logger.debug(f"Probed {server.name}: {table.status(server.name)}")
+        if not entry.ok:
+            logger.info(f"Server {server.name} failed its health check: {entry.error}")
+
+    await asyncio.gather(*(probe(server) for server in servers.values()))
+
+
+def load_servers(config_path: str | Path) -> dict[str, Server]:
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return {
+        name: Server(name=name, config=ServerConfig(**config_data))
+        for name, config_data in config.get("mcpServers", {}).items()
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Probe the health of MCP servers")
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=str(Path(__file__).resolve().parent / "config" / "clean_config.json"),
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=os.getenv("SERVER_HEALTH_PATH") or str(DEFAULT_HEALTH_PATH),
+    )
+    parser.add_argument(
+        "--servers", nargs="*", default=None, help="Only probe these servers"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--slow_ms", type=float, default=10000.0)
+    return parser.parse_args()
+
+
+async def main():
+    args = get_args()
+    servers = load_servers(args.config)
+    if args.servers:
+        servers = {name: servers[name] for name in args.servers if name in servers}
+    table = HealthTable(args.output, slow_ms=args.slow_ms)
+    start = time.perf_counter()
+    await probe_servers(table, servers, args.timeout, args.concurrency)
+    table.save()
+    print(table.format())
+    counts = {}
+    for name in servers:
+        status = table.status(name)
+        counts[status] = counts.get(status, 0) + 1
+    print(
+        f"Probed {len(servers)} servers in {time.perf_counter() - start:.1f}s: "
+        + ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    )
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,272 @@
+"""Compiled, memory-mapped form of the tool index.
+
+The index JSON (``mcp_arg_*.json``) keeps every embedding as a list of
+floats, so each copilot process used to parse and hold its own copy. The
+compiled index is a directory next to the JSON with:
+
+- ``meta.json``: server and tool metadata without embeddings, and the row
+  layout of the matrices.
+- ``*.npy``: the normalized (optionally quantized) embedding matrices.
+
+The matrices are opened with ``np.load(mmap_mode="r")``, so all copilot
+processes on a node share the same physical pages through the page cache.
+The directory is recompiled when the source JSON changes; ``meta.json`` is
+replaced last, so readers see either the old or the new index.
+
+Usage:
+    python -m baseline.mcp_copilot.index_store ./baseline/mcp_copilot/config/mcp_arg_xxx.json --quantization int8
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from baseline.mcp_copilot.quantization import QuantizedMatrix, quantize
+from baseline.mcp_copilot.retrieval import normalize
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+META_FILE = "meta.json"
+
+
+def content_hash(value: Any) -> str:
+    """Stable short hash of a JSON-serializable value."""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def stack_embeddings(
+    servers: List[Dict[str, Any]], dimensions: int
+) -> Dict[str, np.ndarray]:
+    """Stack the embeddings of an index into normalized matrices.
+
+    Each server contributes a description and an optional summary row to the
+    server matrix. ``tool_refs`` holds ``(server_index, tool_index)`` for
+    every tool row.
+    """
+    server_rows, server_row_index = [], []
+    server_has_summary = np.zeros(len(servers), dtype=bool)
+    tool_rows, tool_refs = [], []
+    for i, server in enumerate(servers):
+        if server.get("description_embedding"):
+            server_rows.append(server["description_embedding"])
+            server_row_index.append(i)
+            if server.get("summary_embedding"):
+                server_rows.append(server["summary_embedding"])
+                server_row_index.append(i)
+                server_has_summary[i] = True
+        for j, tool in enumerate(server.get("tools") or []):
+            if tool.get("description_embedding"):
+                tool_rows.append(tool["description_embedding"])
+                tool_refs.append((i, j))
+
+    dimensions = len(server_rows[0]) if server_rows else dimensions
+    return {
+        "server_vectors": normalize(np.reshape(server_rows, (-1, dimensions))),
+        "server_row_index": np.array(server_row_index, dtype=np.int64),
+        "server_has_summary": server_has_summary,
+        "tool_vectors": normalize(np.reshape(tool_rows, (-1, dimensions))),
+        "tool_refs": np.array(tool_refs, dtype=np.int64).reshape(-1, 2),
+    }
+
+
+def strip_embeddings(server: Dict[str, Any]) -> Dict[str, Any]:
+    server = {
+        key: value
+        for key, value in server.items()
+        if key not in ("description_embedding", "summary_embedding")
+    }
+    server["tools"] = [
+        {key: value for key, value in tool.items() if key != "description_embedding"}
+        for tool in server.get("tools") or []
+    ]
+    return server
+
+
+def index_dir_for(data_path: str | Path, quantization: str = "none") -> Path:
+    return Path(f"{data_path}.{quantization}.index")
+
+
+def _source_stat(data_path: str | Path) -> Dict[str, int]:
+    stat = os.stat(data_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_meta(index_dir: str | Path) -> Dict[str, Any]:
+    with open(Path(index_dir) / META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_fresh(data_path: str | Path, index_dir: str | Path) -> bool:
+    """Whether ``index_dir`` was compiled from the current ``data_path``."""
+    try:
+        meta = read_meta(index_dir)
+    except (OSError, json.JSONDecodeError):
+        return False
+    return (
+        meta.get("version") == INDEX_VERSION
+        and meta.get("source") == _source_stat(data_path)
+    )
+
+
+def compile_index(
+    data_path: str | Path,
+    index_dir: str | Path | None = None,
+    quantization: str = "none",
+    dimensions: int = 1024,
+) -> Path:
+    """Compile the index JSON at ``data_path`` into ``index_dir``."""
+    index_dir = Path(index_dir or index_dir_for(data_path, quantization))
+    index_dir.mkdir(parents=True, exist_ok=True)
+    source = _source_stat(data_path)
+    with open(data_path, "r", encoding="utf-8") as f:
+        servers = json.load(f)
+    stacked = stack_embeddings(servers, dimensions)
+
+    arrays = {
+        "server_row_index": stacked["server_row_index"],
+        "server_has_summary": stacked["server_has_summary"],
+        "tool_refs": stacked["tool_refs"],
+    }
+    for name in ("server_vectors", "tool_vectors"):
+        matrix = quantize(stacked[name], quantization)
+        if isinstance(matrix, QuantizedMatrix):
+            arrays[name] = matrix.codes
+            if matrix.scales is not None:
+                arrays[f"{name}_scales"] = matrix.scales
+        else:
+            arrays[name] = matrix
+
+    # New files get a fresh tag so processes still mapping the old ones are
+    # unaffected; meta.json is switched over last.
+    tag = uuid.uuid4().hex[:8]
+    files = {}
+    for name, array in arrays.items():
+        files[name] = f"{name}.{tag}.npy"
+        np.save(index_dir / files[name], np.ascontiguousarray(array))
+    meta = {
+        "version": INDEX_VERSION,
+        "source": source,
+        "quantization": quantization,
+        "arrays": files,
+        "servers": [strip_embeddings(server) for server in servers],
+    }
+    tmp_path = index_dir / f".{META_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, index_dir / META_FILE)
+
+    keep = set(files.values()) | {META_FILE}
+    for path in index_dir.glob("*.npy"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    return index_dir
+
+
+@contextmanager
+def _locked(index_dir: Path):
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_dir.parent / f".{index_dir.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def ensure_index(
+    data_path: str | Path,
+    quantization: str = "none",
+    dimensions: int = 1024,
+    force: bool = False,
+) -> Path:
+    """Return the compiled index of ``data_path``, compiling it when stale.
+
+    Concurrent copilot processes serialize on a lock file so the index is
+    compiled once and then shared.
+    """
+    index_dir = index_dir_for(data_path, quantization)
+    if not force and is_fresh(data_path, index_dir):
+        return index_dir
+    with _locked(index_dir):
+        if force or not is_fresh(data_path, index_dir):
+            start = time.perf_counter()
+            compile_index(data_path, index_dir, quantization, dimensions)
+            logger.info(
+                f"Compiled {data_path} to {index_dir} "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+    return index_dir
+
+
+def load_index(index_dir: str | Path) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Return the metadata and the memory-mapped arrays of a compiled index."""
+    index_dir = Path(index_dir)
+    for attempt in range(2):
+        meta = read_meta(index_dir)
+        try:
+            arrays = {
+                name: np.load(index_dir / file_name, mmap_mode="r")
+                for name, file_name in meta["arrays"].items()
+            }
+            break
+        except FileNotFoundError:
+            # Recompiled between reading meta.json and opening the arrays
+            if attempt:
+                raise
+    for name in ("server_vectors", "tool_vectors"):
+        if meta["quantization"] != "none":
+            arrays[name] = QuantizedMatrix(
+                arrays[name], arrays.pop(f"{name}_scales", None)
+            )
+    return meta, arrays
+
+
+def indexed_server_hashes(data_path: str | Path) -> Dict[str, Optional[str]]:
+    """Content hash of every server in an index, by server name.
+
+    Read from a fresh compiled copy when there is one, so the embeddings do
+    not have to be parsed. Entries indexed before hashes existed map to None.
+    """
+    data_path = Path(data_path)
+    for index_dir in data_path.parent.glob(f"{data_path.name}.*.index"):
+        if is_fresh(data_path, index_dir):
+            servers = read_meta(index_dir)["servers"]
+            break
+    else:
+        with open(data_path, "r", encoding="utf-8") as f:
+            servers = json.load(f)
+    return {
+        server["server_name"]: server.get("content_hash")
+        for server in servers
+        if "server_name" in server
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Compile the tool index")
+    parser.add_argument("data_path", type=str)
+    parser.add_argument(
+        "--quantization", choices=["none", "float16", "int8"], default="none"
+    )
+    parser.add_argument("--dimensions", type=int, default=1024)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    index_dir = ensure_index(
+        args.data_path, args.quantization, args.dimensions, force=True
+    )
+    print(f"Compiled {args.data_path} -> {index_dir}")
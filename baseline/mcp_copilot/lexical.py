@@ -0,0 +1,102 @@
+"""In-process BM25 index over tool names, descriptions and parameter names.
+
+Used by ToolMatcher for hybrid retrieval: fused with embedding scores via
+reciprocal rank fusion, and as a lexical-only fallback when the embedding
+service is slow or unavailable.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+_CJK_SPLIT = re.compile(f"[{_CJK_RANGES}]|[^{_CJK_RANGES}]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase terms.
+
+    Identifiers such as ``get-weread-rank``, ``convert_to_pdf`` or
+    ``listFiles`` are split into their words; CJK runs are split into single
+    characters since they carry no whitespace.
+    """
+    if not text:
+        return []
+    tokens = []
+    for word in _WORD.findall(_CAMEL_BOUNDARY.sub(" ", text)):
+        tokens.extend(part.lower() for part in _CJK_SPLIT.findall(word))
+    return tokens
+
+
+def normalize_name(text: str) -> str:
+    """Canonical form of an identifier for verbatim name matching."""
+    return " ".join(tokenize(text))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: int = 60
+) -> List[Tuple[int, float]]:
+    """Fuse several rankings of document ids, best first."""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_norm: Optional[np.ndarray] = None
+
+    def build(self, documents: List[List[str]]) -> None:
+        self.n_docs = len(documents)
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, tokens in enumerate(documents):
+            lengths[doc_id] = len(tokens)
+            for token in tokens:
+                postings[token][doc_id] = postings[token].get(doc_id, 0) + 1
+        avg_length = float(lengths.mean()) if self.n_docs else 0.0
+        # Per-document length normalization term of the BM25 denominator
+        self.doc_norm = self.k1 * (
+            1 - self.b + self.b * lengths / (avg_length or 1.0)
+        )
+        self.postings = {
+            token: (
+                np.fromiter(docs.keys(), dtype=np.int64),
+                np.fromiter(docs.values(), dtype=np.float32),
+            )
+            for token, docs in postings.items()
+        }
+        self.idf = {
+            token: math.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in postings.items()
+        }
+
+    def scores(self, tokens: List[str]) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokens):
+            if token not in self.postings:
+                continue
+            doc_ids, tf = self.postings[token]
+            scores[doc_ids] += (
+                self.idf[token] * tf * (self.k1 + 1) / (tf + self.doc_norm[doc_ids])
+            )
+        return scores
+
+    def search(self, tokens: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(doc_ids, scores)`` of the ``k`` best matching documents."""
+        scores = self.scores(tokens)
+        hits = np.flatnonzero(scores > 0)
+        order = hits[np.lexsort((hits, -scores[hits]))][:k]
+        return order, scores[order]
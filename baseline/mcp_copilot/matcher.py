@@ -1,14 +1,39 @@
 # from mcp zero
 # https://github.com/xfey/MCP-Zero/blob/master/MCP-zero/matcher.py
+import asyncio
+import copy
 import json
+import logging
 import numpy as np
 import re
 import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Tuple, Optional
-from openai import OpenAI
+
+from baseline.mcp_copilot.embedding import EmbeddingProvider, OpenAIEmbeddingProvider
+from baseline.mcp_copilot.lexical import (
+    BM25Index,
+    normalize_name,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from baseline.mcp_copilot.index_store import (
+    ensure_index,
+    load_index,
+    stack_embeddings,
+    strip_embeddings,
+)
+from baseline.mcp_copilot.quantization import QUANTIZATIONS, concatenate, quantize
+from baseline.mcp_copilot.retrieval import RetrievalBackend, get_backend, normalize
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingUnavailableError(ValueError):
+    """Raised when a query embedding cannot be obtained."""
 
 
 class ToolMatcher:
@@ -18,17 +43,57 @@ class ToolMatcher:
         dimensions: int,
         top_servers: int = 5,
         top_tools: int = 3,
+        backend: str = "exact",
+        fusion: str = "none",
+        embedding_timeout: Optional[float] = None,
+        embedding_cooldown: float = 30.0,
+        lexical_candidates: int = 50,
+        score_workers: int = 4,
+        quantization: str = "none",
+        executor: Optional[ThreadPoolExecutor] = None,
     ):
         self.embedding_model = embedding_model
         self.dimensions = dimensions
         self.top_servers = top_servers
         self.top_tools = top_tools
+        self.backend_name = backend
+        if fusion not in ("none", "rrf"):
+            raise ValueError(f"Unknown fusion mode '{fusion}', expected none or rrf.")
+        self.fusion = fusion
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}."
+            )
+        self.quantization = quantization
+        self.embedding_timeout = embedding_timeout
+        self.embedding_cooldown = embedding_cooldown
+        self.lexical_candidates = lexical_candidates
+        self._embedding_down_until = 0.0
         self.servers_data = None
         self.tool_assistant_pattern = re.compile(
             r"<tool_assistant>\s*server:\s*(.*?)\s*tool:\s*(.*?)\s*</tool_assistant>",
             re.DOTALL,
         )
-        self.openai_client = None
+        self.embedding_provider: Optional[EmbeddingProvider] = None
+        self._owns_provider = False
+        # CPU scoring runs here so async callers do not block their event loop.
+        # A shared executor is owned, and shut down, by whoever passed it in.
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=score_workers, thread_name_prefix="tool-matcher"
+        )
+        # Embedding matrices built by load_data
+        self.server_backend: Optional[RetrievalBackend] = None
+        self.server_row_index = None
+        self.server_has_summary = None
+        self.tool_vectors = None
+        self.tool_refs: List[Tuple[int, Dict[str, Any]]] = []
+        self.tool_ref_index = np.empty((0, 2), dtype=np.int64)
+        self.server_tool_rows: List[np.ndarray] = []
+        # Lexical index over the same tool rows
+        self.lexical_index: Optional[BM25Index] = None
+        self.tool_name_rows: Dict[str, List[int]] = {}
+        self.max_name_words = 0
 
     def load_data(self, data_path: str) -> None:
         try:
@@ -37,13 +102,217 @@ class ToolMatcher:
             print(f"Loaded {len(self.servers_data)} servers from {data_path}")
         except Exception as e:
             raise ValueError(f"Error loading tool data: {e}")
+        self.build_index(index_path=f"{data_path}.{self.backend_name}.npz")
+
+    def build_index(self, index_path: Optional[str] = None) -> None:
+        """Stack the embeddings of servers_data into normalized matrices.
+
+        Each server contributes a description and an optional summary row to
+        the server matrix, which is searched by the retrieval backend. Tool
+        rows are grouped per server so the tool stage only scores the tools of
+        the matched servers. With quantization enabled the matrices are stored
+        as float16 or int8 and the raw embedding lists are dropped from
+        servers_data, which only needs them here.
+        """
+        stacked = stack_embeddings(self.servers_data, self.dimensions)
+        server_vectors = quantize(stacked["server_vectors"], self.quantization)
+        tool_vectors = quantize(stacked["tool_vectors"], self.quantization)
+        if self.quantization != "none":
+            self.release_embeddings()
+        self.set_index(
+            server_vectors,
+            stacked["server_row_index"],
+            stacked["server_has_summary"],
+            tool_vectors,
+            stacked["tool_refs"],
+            index_path,
+        )
+
+    def load_index(self, data_path: str) -> None:
+        """Load the compiled, memory-mapped copy of an index JSON.
+
+        The copy is compiled on first use and whenever the JSON changes. Falls
+        back to parsing the JSON when the compiled copy cannot be written.
+        """
+        try:
+            index_dir = ensure_index(data_path, self.quantization, self.dimensions)
+        except OSError as e:
+            logger.warning(f"Could not compile {data_path} ({e}), loading the JSON.")
+            self.load_data(data_path)
+            return
+        self.load_compiled(index_dir)
+
+    def load_compiled(self, index_dir: str | Path) -> None:
+        meta, arrays = load_index(index_dir)
+        if meta["quantization"] != self.quantization:
+            raise ValueError(
+                f"{index_dir} is quantized as {meta['quantization']}, "
+                f"expected {self.quantization}."
+            )
+        self.servers_data = meta["servers"]
+        logger.info(f"Loaded {len(self.servers_data)} servers from {index_dir}")
+        self.set_index(
+            arrays["server_vectors"],
+            arrays["server_row_index"],
+            arrays["server_has_summary"],
+            arrays["tool_vectors"],
+            arrays["tool_refs"],
+            index_path=str(Path(index_dir) / f"{self.backend_name}.npz"),
+        )
+
+    def set_index(
+        self,
+        server_vectors,
+        server_row_index: np.ndarray,
+        server_has_summary: np.ndarray,
+        tool_vectors,
+        tool_refs: np.ndarray,
+        index_path: Optional[str] = None,
+    ) -> None:
+        """Install normalized matrices and build the retrieval indexes."""
+        self.server_row_index = np.asarray(server_row_index)
+        self.server_has_summary = np.asarray(server_has_summary)
+        self.tool_vectors = tool_vectors
+        self.tool_ref_index = np.asarray(tool_refs, dtype=np.int64).reshape(-1, 2)
+        self.tool_refs = [
+            (int(i), self.servers_data[i]["tools"][j]) for i, j in self.tool_ref_index
+        ]
+        rows: List[List[int]] = [[] for _ in self.servers_data]
+        for row, (server_index, _) in enumerate(self.tool_refs):
+            rows[server_index].append(row)
+        self.server_tool_rows = [np.array(r, dtype=np.int64) for r in rows]
+
+        backend = get_backend(self.backend_name)
+        if not (index_path and backend.load(index_path, server_vectors)):
+            backend.build(server_vectors)
+            if index_path:
+                backend.save(index_path)
+        self.server_backend = backend
+        self.build_lexical_index()
+
+    def update_servers(
+        self, entries: List[Dict[str, Any]], removed: List[str] = ()
+    ) -> None:
+        """Apply an index diff without reloading the whole index.
+
+        ``entries`` are new or changed index entries (with embeddings) and
+        ``removed`` names servers to drop. Rows of replaced and removed
+        servers are cut from the matrices and the rows of ``entries``
+        appended, so the cost is proportional to the change plus a rebuild of
+        the retrieval and lexical indexes.
+        """
+        drop = set(removed) | {entry["server_name"] for entry in entries}
+        keep = [
+            i
+            for i, server in enumerate(self.servers_data)
+            if server["server_name"] not in drop
+        ]
+        remap = np.full(len(self.servers_data), -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        server_rows = np.flatnonzero(remap[self.server_row_index] >= 0)
+        tool_rows = np.flatnonzero(remap[self.tool_ref_index[:, 0]] >= 0)
+
+        server_vectors = self.server_backend.vectors
+        stacked = stack_embeddings(entries, server_vectors.shape[1])
+        offset = np.array([len(keep), 0])
+        old_tool_refs = self.tool_ref_index[tool_rows]
+        old_tool_refs = np.column_stack(
+            [remap[old_tool_refs[:, 0]], old_tool_refs[:, 1]]
+        )
+
+        self.servers_data = [self.servers_data[i] for i in keep] + [
+            strip_embeddings(entry) for entry in entries
+        ]
+        self.set_index(
+            concatenate(
+                [
+                    server_vectors[server_rows],
+                    quantize(stacked["server_vectors"], self.quantization),
+                ]
+            ),
+            np.concatenate(
+                [
+                    remap[self.server_row_index[server_rows]],
+                    stacked["server_row_index"] + len(keep),
+                ]
+            ),
+            np.concatenate(
+                [self.server_has_summary[keep], stacked["server_has_summary"]]
+            ),
+            concatenate(
+                [
+                    self.tool_vectors[tool_rows],
+                    quantize(stacked["tool_vectors"], self.quantization),
+                ]
+            ),
+            np.concatenate([old_tool_refs, stacked["tool_refs"] + offset]),
+        )
+
+    def updated(
+        self, entries: List[Dict[str, Any]], removed: List[str] = ()
+    ) -> "ToolMatcher":
+        """Copy of this matcher with an index diff applied by update_servers.
+
+        The copy shares the embedding provider and executor without owning
+        them, so closing the copy leaves them running; this matcher is left
+        untouched, so routes already running against it are unaffected.
+        """
+        matcher = copy.copy(self)
+        matcher._owns_executor = False
+        matcher._owns_provider = False
+        matcher.update_servers(entries, removed)
+        return matcher
+
+    def release_embeddings(self) -> None:
+        """Drop the per-entry embedding lists once they are in the matrices."""
+        for server in self.servers_data:
+            server.pop("description_embedding", None)
+            server.pop("summary_embedding", None)
+            for tool in server.get("tools") or []:
+                tool.pop("description_embedding", None)
+
+    def build_lexical_index(self) -> None:
+        """Index tool names, descriptions and parameter names with BM25."""
+        documents = []
+        self.tool_name_rows = {}
+        for row, (server_index, tool) in enumerate(self.tool_refs):
+            server = self.servers_data[server_index]
+            # Names are repeated so that they outweigh long descriptions.
+            documents.append(
+                2 * tokenize(tool["name"])
+                + tokenize(server.get("server_name"))
+                + tokenize(tool.get("description"))
+                + tokenize(" ".join(tool.get("parameter") or {}))
+            )
+            name = normalize_name(tool["name"])
+            self.tool_name_rows.setdefault(name, []).append(row)
+            self.max_name_words = max(self.max_name_words, len(name.split()))
+        self.lexical_index = BM25Index()
+        self.lexical_index.build(documents)
+
+    def set_embedding_provider(
+        self, provider: EmbeddingProvider, owned: bool = True
+    ) -> None:
+        """Use provider for embeddings; aclose() closes it only when owned."""
+        self.embedding_provider = provider
+        self._owns_provider = owned
 
     def setup_openai_client(self, base_url: str, api_key: str) -> None:
-        self.openai_client = OpenAI(
-            base_url=base_url,
-            api_key=api_key,
+        self.set_embedding_provider(
+            OpenAIEmbeddingProvider(
+                model=self.embedding_model,
+                base_url=base_url,
+                api_key=api_key,
+                timeout=self.embedding_timeout,
+            )
         )
 
+    async def aclose(self) -> None:
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+        if self.embedding_provider and self._owns_provider:
+            await self.embedding_provider.aclose()
+
     def extract_tool_assistant(self, text: str) -> Tuple[Optional[str], Optional[str]]:
         match = self.tool_assistant_pattern.search(text)
         if match:
@@ -52,31 +321,81 @@ class ToolMatcher:
             return server_desc, tool_desc
         return None, None
 
-    def get_embedding(self, text: str, max_retries: int = 3) -> Optional[List[float]]:
-        if not self.openai_client:
+    def extract_tool_assistants(self, text: str) -> List[Tuple[str, str]]:
+        """Extract every ``<tool_assistant>`` block of a query."""
+        blocks = []
+        for match in self.tool_assistant_pattern.finditer(text):
+            server_desc = match.group(1).strip()
+            tool_desc = match.group(2).strip()
+            if server_desc and tool_desc:
+                blocks.append((server_desc, tool_desc))
+        return blocks
+
+    def get_embeddings(
+        self, texts: List[str], max_retries: int = 3
+    ) -> Optional[List[List[float]]]:
+        """Embed several texts in a single batched request."""
+        if not self.embedding_provider:
             raise ValueError(
-                "OpenAI client not initialized. Call setup_openai_client first."
+                "Embedding provider not initialized. Call set_embedding_provider first."
             )
 
+        # Skip the round-trip while the service is known to be down.
+        if time.monotonic() < self._embedding_down_until:
+            return None
         for attempt in range(max_retries):
             try:
-                time.sleep(0.05)
-                response = self.openai_client.embeddings.create(
-                    input=[text],
-                    model=self.embedding_model,
-                    # dimensions=self.dimensions,
-                    encoding_format="float",
-                )
-                return response.data[0].embedding
+                return self.embedding_provider.embed(texts)
             except Exception as e:
                 if attempt < max_retries - 1:
                     wait_time = 2**attempt
-                    print(f"Error getting embedding, retrying in {wait_time}s: {e}")
+                    logger.warning(
+                        f"Error getting embedding, retrying in {wait_time}s: {e}"
+                    )
                     time.sleep(wait_time)
                 else:
-                    print(f"Failed to get embedding after {max_retries} attempts: {e}")
+                    logger.error(
+                        f"Failed to get embedding after {max_retries} attempts: {e}"
+                    )
+                    self._embedding_down_until = (
+                        time.monotonic() + self.embedding_cooldown
+                    )
+                    return None
+
+    async def aget_embeddings(
+        self, texts: List[str], max_retries: int = 3
+    ) -> Optional[List[List[float]]]:
+        """Async variant of get_embeddings that never blocks the event loop."""
+        if not self.embedding_provider:
+            raise ValueError(
+                "Embedding provider not initialized. Call set_embedding_provider first."
+            )
+
+        if time.monotonic() < self._embedding_down_until:
+            return None
+        for attempt in range(max_retries):
+            try:
+                return await self.embedding_provider.aembed(texts)
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    wait_time = 2**attempt
+                    logger.warning(
+                        f"Error getting embedding, retrying in {wait_time}s: {e}"
+                    )
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error(
+                        f"Failed to get embedding after {max_retries} attempts: {e}"
+                    )
+                    self._embedding_down_until = (
+                        time.monotonic() + self.embedding_cooldown
+                    )
                     return None
 
+    def get_embedding(self, text: str, max_retries: int = 3) -> Optional[List[float]]:
+        embeddings = self.get_embeddings([text], max_retries=max_retries)
+        return embeddings[0] if embeddings else None
+
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         vec1 = np.array(vec1)
         vec2 = np.array(vec2)
@@ -86,94 +405,317 @@ class ToolMatcher:
             return 0
         return np.dot(vec1, vec2) / (norm1 * norm2)
 
+    def _rank_servers(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        server_scores: Dict[int, float] = {}
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            i = int(self.server_row_index[row])
+            if not self.server_has_summary[i]:
+                score = max(score, 0.0)
+            if score > server_scores.get(i, -np.inf):
+                server_scores[i] = score
+        ranked = sorted(server_scores.items(), key=lambda x: (-x[1], x[0]))
+        return [
+            {"server": self.servers_data[i], "index": i, "score": score}
+            for i, score in ranked[: self.top_servers]
+        ]
+
+    def score_servers(self, query_vector: np.ndarray) -> List[Dict[str, Any]]:
+        """Rank servers by max(description, summary) similarity to the query."""
+        return self.score_servers_many(query_vector[None, :])[0]
+
+    def score_servers_many(
+        self, query_vectors: np.ndarray
+    ) -> List[List[Dict[str, Any]]]:
+        # Each server owns at most two rows, so the best 2 * top_servers rows
+        # always contain the best row of every top server.
+        return [
+            self._rank_servers(rows, scores)
+            for rows, scores in self.server_backend.search_many(
+                query_vectors, 2 * self.top_servers
+            )
+        ]
+
+    def _tool_result(self, row: int, **scores: float) -> Dict[str, Any]:
+        server_index, tool = self.tool_refs[row]
+        return {
+            "server_name": self.servers_data[server_index]["server_name"],
+            "tool_name": tool["name"],
+            "tool_description": tool.get("description", ""),
+            "inputschema": tool.get("parameter", {}),
+            **scores,
+        }
+
+    def candidate_rows(self, server_list: List[Dict[str, Any]]) -> np.ndarray:
+        """Tool rows of the matched servers, in server rank order."""
+        rows = [self.server_tool_rows[info["index"]] for info in server_list]
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def rank_tools(
+        self,
+        server_list: List[Dict[str, Any]],
+        query_vector: np.ndarray,
+        tool_scores: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Combine server and tool similarities of the matched servers' tools.
+
+        ``tool_scores`` may hold precomputed similarities aligned with
+        ``candidate_rows(server_list)``. Returns the tool rows, server scores,
+        tool scores and final scores, ordered by final score.
+        """
+        rows = self.candidate_rows(server_list)
+        server_score_of = {info["index"]: info["score"] for info in server_list}
+        server_scores = np.array(
+            [server_score_of[self.tool_refs[row][0]] for row in rows], dtype=np.float32
+        )
+        if tool_scores is None:
+            tool_scores = self.tool_vectors[rows] @ query_vector
+        final_scores = (server_scores * tool_scores) * np.maximum(
+            server_scores, tool_scores
+        )
+        order = np.argsort(-final_scores, kind="stable")
+        return rows[order], server_scores[order], tool_scores[order], final_scores[order]
+
+    def score_tools(
+        self, server_list: List[Dict[str, Any]], query_vector: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        return self._top_tool_results(*self.rank_tools(server_list, query_vector))
+
+    def _top_tool_results(self, rows, server_scores, tool_scores, final_scores):
+        return [
+            self._tool_result(
+                int(rows[j]),
+                server_score=float(server_scores[j]),
+                tool_score=float(tool_scores[j]),
+                final_score=float(final_scores[j]),
+            )
+            for j in range(min(self.top_tools, len(rows)))
+        ]
+
+    def lexical_rank(self, server_desc: str, tool_desc: str, k: int) -> np.ndarray:
+        """BM25 ranking of all tools for the server and tool descriptions."""
+        rows, _ = self.lexical_index.search(
+            tokenize(tool_desc) + tokenize(server_desc), k
+        )
+        return rows
+
+    def find_named_tools(self, tool_desc: str) -> List[int]:
+        """Rows of tools whose name appears verbatim in the tool description."""
+        tokens = normalize_name(tool_desc).split()
+        rows = []
+        # Single-word names such as "search" are too ambiguous to match.
+        for n in range(2, self.max_name_words + 1):
+            for i in range(len(tokens) - n + 1):
+                for row in self.tool_name_rows.get(" ".join(tokens[i : i + n]), []):
+                    if row not in rows:
+                        rows.append(row)
+        return rows
+
+    def lexical_match(self, server_desc: str, tool_desc: str) -> List[Dict[str, Any]]:
+        rows = self.lexical_rank(server_desc, tool_desc, self.top_tools)
+        return [self._tool_result(int(row)) for row in rows]
+
+    def named_match(
+        self, server_desc: str, tool_desc: str, named_rows: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Order tools named verbatim in the query by their BM25 rank."""
+        ranked = reciprocal_rank_fusion(
+            [named_rows, self.lexical_rank(server_desc, tool_desc, len(named_rows))]
+        )
+        return [self._tool_result(row) for row, _ in ranked if row in named_rows][
+            : self.top_tools
+        ]
+
+    def plan_blocks(
+        self, blocks: List[Tuple[str, str]]
+    ) -> Tuple[List[Optional[List[Dict[str, Any]]]], List[int], List[str]]:
+        """Resolve blocks that need no embedding and collect the texts to embed.
+
+        Returns the partial results, the indices of the blocks still pending
+        and the unique texts to embed for them.
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(blocks)
+        pending = []
+        for i, (server_desc, tool_desc) in enumerate(blocks):
+            named_rows = self.find_named_tools(tool_desc) if self.fusion == "rrf" else []
+            if named_rows:
+                # The agent named a tool; no embedding round-trip is needed.
+                results[i] = self.named_match(server_desc, tool_desc, named_rows)
+            else:
+                pending.append(i)
+        if pending and not self.servers_data:
+            raise ValueError("No server data loaded. Call load_data first.")
+        texts = list(dict.fromkeys(text for i in pending for text in blocks[i]))
+        return results, pending, texts
+
+    def score_blocks(
+        self,
+        blocks: List[Tuple[str, str]],
+        results: List[Optional[List[Dict[str, Any]]]],
+        pending: List[int],
+        texts: List[str],
+        embeddings: Optional[List[List[float]]],
+    ) -> List[List[Dict[str, Any]]]:
+        """Score the pending blocks given the embeddings of ``texts``.
+
+        Servers are scored for every block with one matrix product, and the
+        tools of all matched servers with another. Without embeddings the
+        blocks fall back to lexical matching.
+        """
+        if not pending:
+            return results
+        if not embeddings:
+            for i in pending:
+                results[i] = self.lexical_match(*blocks[i])
+            if not any(results[i] for i in pending):
+                raise EmbeddingUnavailableError("Failed to get embedding for query")
+            logger.warning("Embedding unavailable, using lexical matching.")
+            return results
+
+        vectors = normalize(embeddings)
+        position = {text: j for j, text in enumerate(texts)}
+        server_queries = vectors[[position[blocks[i][0]] for i in pending]]
+        tool_queries = vectors[[position[blocks[i][1]] for i in pending]]
+        server_lists = self.score_servers_many(server_queries)
+        block_rows = [self.candidate_rows(server_list) for server_list in server_lists]
+        union_rows, inverse = np.unique(
+            np.concatenate(block_rows), return_inverse=True
+        )
+        all_scores = self.tool_vectors[union_rows] @ tool_queries.T
+        offset = 0
+        for j, i in enumerate(pending):
+            n_rows = len(block_rows[j])
+            tool_scores = all_scores[inverse[offset : offset + n_rows], j]
+            offset += n_rows
+            ranked = self.rank_tools(server_lists[j], tool_queries[j], tool_scores)
+            if self.fusion == "rrf":
+                lexical_rows = self.lexical_rank(
+                    *blocks[i], k=self.lexical_candidates
+                )
+                fused = reciprocal_rank_fusion(
+                    [ranked[0].tolist(), lexical_rows.tolist()]
+                )
+                results[i] = [
+                    self._tool_result(row) for row, _ in fused[: self.top_tools]
+                ]
+            else:
+                results[i] = self._top_tool_results(*ranked)
+        return results
+
+    def match_blocks(self, blocks: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+        """Match several (server, tool) description pairs in one batch."""
+        results, pending, texts = self.plan_blocks(blocks)
+        embeddings = self.get_embeddings(texts) if pending else None
+        return self.score_blocks(blocks, results, pending, texts, embeddings)
+
+    async def amatch_blocks(
+        self, blocks: List[Tuple[str, str]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Async match_blocks: awaits the embedding request and scores in a thread."""
+        loop = asyncio.get_running_loop()
+        results, pending, texts = await loop.run_in_executor(
+            self.executor, self.plan_blocks, blocks
+        )
+        embeddings = await self.aget_embeddings(texts) if pending else None
+        return await loop.run_in_executor(
+            self.executor,
+            self.score_blocks,
+            blocks,
+            results,
+            pending,
+            texts,
+            embeddings,
+        )
+
     def match_servers(self, server_desc: str) -> List[Dict[str, Any]]:
         if not self.servers_data:
             raise ValueError("No server data loaded. Call load_data first.")
         query_embedding = self.get_embedding(server_desc)
         if not query_embedding:
-            raise ValueError("Failed to get embedding for server description")
-        server_scores = []
-        for server in self.servers_data:
-            if "description_embedding" not in server:
-                continue
-            desc_similarity = self.cosine_similarity(
-                query_embedding, server["description_embedding"]
+            raise EmbeddingUnavailableError(
+                "Failed to get embedding for server description"
             )
-            summary_similarity = 0
-            if "summary_embedding" in server:
-                summary_similarity = self.cosine_similarity(
-                    query_embedding, server["summary_embedding"]
-                )
-            final_score = max(desc_similarity, summary_similarity)
-            server_scores.append({"server": server, "score": final_score})
-        server_scores.sort(key=lambda x: x["score"], reverse=True)
-        return server_scores[: self.top_servers]
+        return self.score_servers(normalize(query_embedding))
 
     def match_tools(
         self, server_list: List[Dict[str, Any]], tool_desc: str
     ) -> List[Dict[str, Any]]:
         query_embedding = self.get_embedding(tool_desc)
         if not query_embedding:
-            raise ValueError("Failed to get embedding for tool description")
-        tool_scores = []
-        for server_info in server_list:
-            server = server_info["server"]
-            server_score = server_info["score"]
-            if "tools" not in server or not server["tools"]:
-                continue
-            for tool in server["tools"]:
-                if "description_embedding" not in tool:
-                    continue
-                tool_similarity = self.cosine_similarity(
-                    query_embedding, tool["description_embedding"]
-                )
-                final_score = (server_score * tool_similarity) * max(
-                    server_score, tool_similarity
-                )
-                tool_scores.append(
-                    {
-                        "server_name": server["server_name"],
-                        "tool_name": tool["name"],
-                        "tool_description": tool.get("description", ""),
-                        "inputschema": tool.get("parameter", {}),
-                        "server_score": server_score,
-                        "tool_score": tool_similarity,
-                        "final_score": final_score,
-                    }
+            raise EmbeddingUnavailableError(
+                "Failed to get embedding for tool description"
+            )
+        return self.score_tools(server_list, normalize(query_embedding))
+
+    def _simplify(self, matched_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "server_name": tool["server_name"],
+                "tool_name": tool["tool_name"],
+                "tool_description": tool["tool_description"],
+                "inputschema": tool["inputschema"],
+            }
+            for tool in matched_tools
+        ]
+
+    def _no_blocks_response(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": "No tool_assistant tag found or invalid format",
+            "matched_servers": [],
+            "matched_tools": [],
+        }
+
+    def _error_response(
+        self, blocks: List[Tuple[str, str]], e: Exception
+    ) -> Dict[str, Any]:
+        error = {"success": False, "error": str(e)}
+        if len(blocks) == 1:
+            error["server_description"], error["tool_description"] = blocks[0]
+        return {**error, "matched_servers": [], "matched_tools": []}
+
+    def _match_response(
+        self,
+        blocks: List[Tuple[str, str]],
+        block_results: List[List[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        if len(blocks) == 1:
+            return {"success": True, "matched_tools": self._simplify(block_results[0])}
+        return {
+            "success": True,
+            "results": [
+                {
+                    "server_description": server_desc,
+                    "tool_description": tool_desc,
+                    "matched_tools": self._simplify(matched_tools),
+                }
+                for (server_desc, tool_desc), matched_tools in zip(
+                    blocks, block_results
                 )
-        tool_scores.sort(key=lambda x: x["final_score"], reverse=True)
-        return tool_scores[: self.top_tools]
+            ],
+        }
 
     def match(self, input_text: str) -> Dict[str, Any]:
-        server_desc, tool_desc = self.extract_tool_assistant(input_text)
-        if not server_desc or not tool_desc:
-            return {
-                "success": False,
-                "error": "No tool_assistant tag found or invalid format",
-                "matched_servers": [],
-                "matched_tools": [],
-            }
+        """Match one or more ``<tool_assistant>`` blocks.
+
+        A single block returns ``matched_tools`` as before; several blocks
+        return one entry per block under ``results``.
+        """
+        blocks = self.extract_tool_assistants(input_text)
+        if not blocks:
+            return self._no_blocks_response()
         try:
-            matched_servers = self.match_servers(server_desc)
-            matched_tools = self.match_tools(matched_servers, tool_desc)
-            simplified_tools = []
-            for tool in matched_tools:
-                simplified_tools.append(
-                    {
-                        "server_name": tool["server_name"],
-                        "tool_name": tool["tool_name"],
-                        "tool_description": tool["tool_description"],
-                        "inputschema": tool["inputschema"],
-                    }
-                )
+            block_results = self.match_blocks(blocks)
+        except Exception as e:
+            return self._error_response(blocks, e)
+        return self._match_response(blocks, block_results)
 
-            return {"success": True, "matched_tools": simplified_tools}
+    async def amatch(self, input_text: str) -> Dict[str, Any]:
+        """Async variant of match for use on an event loop."""
+        blocks = self.extract_tool_assistants(input_text)
+        if not blocks:
+            return self._no_blocks_response()
+        try:
+            block_results = await self.amatch_blocks(blocks)
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "server_description": server_desc,
-                "tool_description": tool_desc,
-                "matched_servers": [],
-                "matched_tools": [],
-            }
+            return self._error_response(blocks, e)
+        return self._match_response(blocks, block_results)
@@ -1,5 +1,9 @@
+import asyncio
+import json
 import logging
+import time
 from contextlib import AsyncExitStack
+from datetime import datetime, timezone
 from typing import Any
 
 import mcp.types as types
@@ -11,6 +15,11 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# Phases of connect(): transport/process start, client session setup, the
+# initialize handshake (for npx/uvx servers this includes resolving and
+# installing the package) and the first list_tools call
+PHASES = ("spawn", "session", "initialize", "list_tools")
+
 
 class MCPConnection:
     """Manages MCP server and client connection."""
@@ -19,9 +28,43 @@ class MCPConnection:
         self.server = server
         self._session: ClientSession | None = None
         self._exit_stack = AsyncExitStack()
+        # Milliseconds spent in each of PHASES by connect()
+        self.timings: dict[str, float] = {}
+        self._phase_start = 0.0
+
+    def _mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.timings[phase] = 1000 * (now - self._phase_start)
+        self._phase_start = now
+
+    @property
+    def failed_phase(self) -> str | None:
+        """First phase that did not complete, after a failed connect()."""
+        return next((phase for phase in PHASES if phase not in self.timings), None)
+
+    def _log_timings(self, error: str | None = None) -> None:
+        # Instrumentation mode: one JSON line per connection attempt
+        path = os.getenv("MCP_TIMING_LOG")
+        if not path:
+            return
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "server": self.server.name,
+            "ok": error is None,
+            "error": error,
+            "failed_phase": self.failed_phase if error else None,
+            **{f"{phase}_ms": self.timings.get(phase) for phase in PHASES},
+        }
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write connection timings to {path}: {e}")
 
     async def connect(self) -> None:
         """Establishes connection to the MCP server using STDIO or SSE."""
+        self.timings = {}
+        self._phase_start = time.perf_counter()
         try:
             if self.server.config.command:
                 PROXY_ENV_LIST = [
@@ -45,10 +88,13 @@ class MCPConnection:
                 read, write = await self._exit_stack.enter_async_context(
                     stdio_client(server_params)
                 )
+                self._mark("spawn")
                 session = await self._exit_stack.enter_async_context(
                     ClientSession(read, write)
                 )
+                self._mark("session")
                 await session.initialize()
+                self._mark("initialize")
                 self._session = session
             elif self.server.config.url:
                 # SSE connection
@@ -58,20 +104,30 @@ class MCPConnection:
                 read, write = await self._exit_stack.enter_async_context(
                     sse_client(**server_params)
                 )
+                self._mark("spawn")
                 session = await self._exit_stack.enter_async_context(
                     ClientSession(read, write)
                 )
+                self._mark("session")
                 await session.initialize()
+                self._mark("initialize")
                 self._session = session
 
             list_tools_result = await self._session.list_tools()
             self.server.tools = list_tools_result.tools
+            self._mark("list_tools")
+            self._log_timings()
 
             logger.info(f"Successfully connected to server: {self.server.name}")
         except Exception as e:
             logging.warning(f"Error initializing server {self.server.name}: {e}")
+            self._log_timings(str(e) or type(e).__name__)
             await self.aclose()
             raise
+        except asyncio.CancelledError:
+            # Timed out by the caller; record how far the connection got
+            self._log_timings("cancelled")
+            raise
 
     async def list_tools(self) -> list[types.Tool]:
         """Lists available tools from the MCP server."""
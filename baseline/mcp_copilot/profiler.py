@@ -0,0 +1,195 @@
+"""Where the connection time of each MCP server goes.
+
+Connects to every server ``--repeat`` times and records the duration of each
+phase of ``MCPConnection.connect``:
+
+- ``spawn``: starting the server process (or opening the SSE stream),
+- ``session``: setting up the client session,
+- ``initialize``: the initialize handshake; for ``npx``/``uvx`` servers this
+  also covers resolving and installing the package,
+- ``list_tools``: the first tool listing.
+
+The connections to one server run one after another, so the first one is
+the cold start and later ones show what a warm package cache gives. Every
+connection is written to ``--output`` (CSV or JSON by file suffix), and the
+p50/p95 of each phase is printed per server, slowest servers first.
+
+The same per-phase timings of every connection the copilot makes can be
+collected by setting ``MCP_TIMING_LOG`` to a JSONL file.
+
+Usage:
+    python -m baseline.mcp_copilot.profiler --repeat 5 --output profile.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from tabulate import tabulate
+
+from baseline.mcp_copilot.health import load_servers
+from baseline.mcp_copilot.mcp_connection import PHASES, MCPConnection
+from baseline.mcp_copilot.schemas import Server
+
+FIELDS = ["server", "repeat", "ok", "error", "failed_phase"] + [
+    f"{phase}_ms" for phase in PHASES
+] + ["total_ms"]
+
+
+async def profile_connection(server: Server, repeat: int, timeout: float) -> dict:
+    connection = MCPConnection(server.model_copy(deep=True))
+    error = None
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            await connection.connect()
+    except TimeoutError:
+        error = f"timed out after {timeout}s"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    finally:
+        total = 1000 * (time.perf_counter() - start)
+        await connection.aclose()
+    row = {
+        "server": server.name,
+        "repeat": repeat,
+        "ok": error is None,
+        "error": error,
+        "failed_phase": connection.failed_phase if error else None,
+        "total_ms": round(total, 1),
+    }
+    for phase in PHASES:
+        ms = connection.timings.get(phase)
+        row[f"{phase}_ms"] = None if ms is None else round(ms, 1)
+    return row
+
+
+async def profile_servers(
+    servers: dict[str, Server],
+    repeat: int = 3,
+    timeout: float = 60.0,
+    concurrency: int = 4,
+) -> list[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def profile(server: Server) -> list[dict]:
+        rows = []
+        async with semaphore:
+            for i in range(repeat):
+                row = await profile_connection(server, i, timeout)
+                rows.append(row)
+                print(
+                    f"{server.name} #{i}: "
+                    + (f"{row['total_ms']:.0f}ms" if row["ok"] else row["error"])
+                )
+                # A server that cannot start will not start on the next try
+                if not row["ok"] and row["failed_phase"] == PHASES[0]:
+                    break
+        return rows
+
+    results = await asyncio.gather(*(profile(server) for server in servers.values()))
+    return [row for rows in results for row in rows]
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return ""
+    p50, p95 = np.percentile(values, [50, 95])
+    return f"{p50:.0f} / {p95:.0f}"
+
+
+def summary_rows(rows: list[dict]) -> list[list[Any]]:
+    by_server: dict[str, list[dict]] = {}
+    for row in rows:
+        by_server.setdefault(row["server"], []).append(row)
+
+    def line(name: str, runs: list[dict]) -> list[Any]:
+        ok = [run for run in runs if run["ok"]]
+        cold = runs[0]["total_ms"] if runs[0]["ok"] and name != "all" else None
+        return (
+            [name, f"{len(ok)}/{len(runs)}"]
+            + [percentiles([run[f"{phase}_ms"] for run in ok]) for phase in PHASES]
+            + [
+                percentiles([run["total_ms"] for run in ok]),
+                "" if cold is None else f"{cold:.0f}",
+                next((run["error"][:40] for run in runs if run["error"]), ""),
+            ]
+        )
+
+    def slowest(item: tuple[str, list[dict]]) -> tuple:
+        totals = [run["total_ms"] for run in item[1] if run["ok"]]
+        return (len(totals) > 0, -float(np.percentile(totals, 95)) if totals else 0)
+
+    lines = [line(name, runs) for name, runs in sorted(by_server.items(), key=slowest)]
+    lines.append(line("all", rows))
+    return lines
+
+
+def write_report(rows: list[dict], path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Profile the connection phases of MCP servers"
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=str(Path(__file__).resolve().parent / "config" / "clean_config.json"),
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Report of every connection, .csv or .json",
+    )
+    parser.add_argument(
+        "--servers", nargs="*", default=None, help="Only profile these servers"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    return parser.parse_args()
+
+
+async def main():
+    args = get_args()
+    servers = load_servers(args.config)
+    if args.servers:
+        servers = {name: servers[name] for name in args.servers if name in servers}
+    start = time.perf_counter()
+    rows = await profile_servers(servers, args.repeat, args.timeout, args.concurrency)
+    print(
+        tabulate(
+            summary_rows(rows),
+            headers=["server", "ok"]
+            + [f"{phase} p50/p95 ms" for phase in PHASES]
+            + ["total p50/p95 ms", "cold ms", "error"],
+        )
+    )
+    print(
+        f"Profiled {len(servers)} servers ({len(rows)} connections) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    if args.output:
+        write_report(rows, args.output)
+        print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+"""Quantized embedding matrices for ToolMatcher.
+
+``QuantizedMatrix`` stores L2-normalized rows either as float16 or as int8
+codes with one float32 scale per row (``row ~= codes * scale``), cutting the
+index to a half or a quarter of its float32 size. Quantization only saves
+memory, it does not make scoring faster: numpy has no int8 or float16 BLAS
+path (int32-accumulated integer products measure no faster than float32), so
+``matrix @ query`` upcasts the codes to float32 one chunk at a time and
+applies the row scales to the products. Only a chunk is ever held as
+float32, never the full matrix.
+
+Usage (score drift and top-k agreement against float32):
+    python -m baseline.mcp_copilot.quantization --data_path ./baseline/mcp_copilot/config/mcp_arg_xxx.json
+    python -m baseline.mcp_copilot.quantization --synthetic 100000 --dimensions 1024
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from baseline.mcp_copilot.retrieval import normalize, top_k
+
+QUANTIZATIONS = ("none", "float16", "int8")
+_CHUNK_ROWS = 4096
+
+
+class QuantizedMatrix:
+    """Row-quantized matrix supporting ``@``, row indexing and ``len``."""
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, vectors: np.ndarray, dtype: str = "int8") -> "QuantizedMatrix":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dtype == "float16":
+            return cls(vectors.astype(np.float16))
+        if dtype != "int8":
+            raise ValueError(f"Unknown quantization '{dtype}', expected float16 or int8.")
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.zeros(0)
+        scales = scales.astype(np.float32)
+        safe = np.where(scales == 0, 1, scales)[:, None]
+        codes = np.clip(np.rint(vectors / safe), -127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, rows) -> "QuantizedMatrix":
+        scales = None if self.scales is None else self.scales[rows]
+        return QuantizedMatrix(self.codes[rows], scales)
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        # Upcast per chunk: float32 BLAS beats integer products in numpy
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self.codes),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self.codes), _CHUNK_ROWS):
+            chunk = self.codes[start : start + _CHUNK_ROWS]
+            out[start : start + _CHUNK_ROWS] = chunk.astype(np.float32) @ other
+        if self.scales is not None:
+            out *= self.scales.reshape((-1,) + (1,) * (out.ndim - 1))
+        return out
+
+    def dequantize(self) -> np.ndarray:
+        vectors = self.codes.astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[:, None]
+        return vectors
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        vectors = self.dequantize()
+        return vectors if dtype is None else vectors.astype(dtype)
+
+
+def quantize(vectors: np.ndarray, quantization: str = "none"):
+    """Return ``vectors`` unchanged for ``none``, else a QuantizedMatrix."""
+    if quantization == "none":
+        return vectors
+    return QuantizedMatrix.quantize(vectors, quantization)
+
+
+def concatenate(matrices: List[Any]):
+    """Stack row matrices that are either all plain or all quantized."""
+    if isinstance(matrices[0], QuantizedMatrix):
+        codes = np.concatenate([matrix.codes for matrix in matrices])
+        if matrices[0].scales is None:
+            return QuantizedMatrix(codes)
+        return QuantizedMatrix(
+            codes, np.concatenate([matrix.scales for matrix in matrices])
+        )
+    return np.concatenate([np.asarray(matrix) for matrix in matrices])
+
+
+def compare(
+    vectors: np.ndarray, queries: np.ndarray, quantization: str, k: int
+) -> Dict[str, float]:
+    """Score drift and top-k agreement of a quantized matrix against float32."""
+    matrix = quantize(vectors, quantization)
+    start = time.perf_counter()
+    exact = vectors @ queries.T
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    approx = matrix @ queries.T
+    approx_time = time.perf_counter() - start
+    drift = np.abs(approx - exact)
+    agreement = []
+    for j in range(queries.shape[0]):
+        truth = top_k(exact[:, j], k)
+        found = top_k(approx[:, j], k)
+        overlap = set(truth.tolist()) & set(found.tolist())
+        agreement.append(len(overlap) / max(len(truth), 1))
+    return {
+        "bytes": matrix.nbytes,
+        "max_drift": float(drift.max()) if drift.size else 0.0,
+        "mean_drift": float(drift.mean()) if drift.size else 0.0,
+        "agreement": float(np.mean(agreement)) if agreement else 0.0,
+        "float32_ms": 1000 * exact_time,
+        "quantized_ms": 1000 * approx_time,
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Measure quantized scoring accuracy")
+    parser.add_argument("--data_path", type=str, default=None)
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Benchmark on this many random vectors instead of an index file.",
+    )
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n_queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        vectors = normalize(rng.standard_normal((args.synthetic, args.dimensions)))
+    else:
+        with open(args.data_path, "r", encoding="utf-8") as f:
+            servers = json.load(f)
+        vectors = normalize(
+            [
+                tool["description_embedding"]
+                for server in servers
+                for tool in server.get("tools", [])
+                if tool.get("description_embedding")
+            ]
+        )
+    picks = rng.choice(len(vectors), min(args.n_queries, len(vectors)), replace=False)
+    queries = normalize(
+        vectors[picks] + args.noise * rng.standard_normal(vectors[picks].shape)
+    )
+    print(f"rows={len(vectors)} float32={vectors.nbytes / 1e6:.2f}MB")
+    for quantization in QUANTIZATIONS[1:]:
+        stats = compare(vectors, queries, quantization, args.k)
+        print(
+            f"{quantization}: size={stats['bytes'] / 1e6:.2f}MB "
+            f"max_drift={stats['max_drift']:.5f} mean_drift={stats['mean_drift']:.5f} "
+            f"top{args.k}_agreement={stats['agreement']:.4f} "
+            f"float32={stats['float32_ms']:.2f}ms {quantization}={stats['quantized_ms']:.2f}ms"
+        )
@@ -0,0 +1,164 @@
+"""Record tool calls made through the copilot and replay them offline.
+
+With ``TOOL_RECORD_PATH`` set, every ``execute-tool`` call is appended to a
+JSONL recording:
+
+    {"time": "...", "server_name": "...", "tool_name": "...",
+     "params": "{...}", "result": {...CallToolResult...}}
+
+(or ``"error": "..."`` when the call raised). With ``TOOL_REPLAY_PATH`` set,
+the router answers ``execute-tool`` from such a recording instead of
+connecting to the servers. A call is matched on server, tool and the
+canonical JSON of its parameters; repeated identical calls are answered
+with the recorded results in order. When no call matches exactly, the
+recorded call of the same tool whose parameters are most similar is used,
+provided the ``difflib`` similarity ratio reaches ``TOOL_REPLAY_THRESHOLD``
+(default 0.8, 1 disables fuzzy matching). Unmatched calls return an error
+result.
+"""
+
+import difflib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import mcp.types as types
+
+from baseline.mcp_copilot.tool_cache import canonical_params
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCallRecorder:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ToolCallRecorder | None":
+        path = os.getenv("TOOL_RECORD_PATH")
+        return cls(path) if path else None
+
+    def record(
+        self,
+        server_name: str,
+        tool_name: str,
+        params: dict[str, Any] | None,
+        result: types.CallToolResult | None = None,
+        error: str | None = None,
+    ) -> None:
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "server_name": server_name,
+            "tool_name": tool_name,
+            "params": canonical_params(params),
+        }
+        if result is not None:
+            record["result"] = result.model_dump(
+                mode="json", by_alias=True, exclude_none=True
+            )
+        else:
+            record["error"] = error
+        # One write per line, so copilot processes can share a recording
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class ToolCallReplayer:
+    def __init__(self, path: str | Path, threshold: float = 0.8):
+        self.path = Path(path)
+        self.threshold = threshold
+        # (server, tool) -> canonical params -> recorded calls, in order
+        self.calls: dict[tuple[str, str], dict[str, list[dict]]] = {}
+        self._served: dict[tuple[str, str, str], int] = {}
+        self.exact = 0
+        self.fuzzy = 0
+        self.misses = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.calls.setdefault(
+                    (record["server_name"], record["tool_name"]), {}
+                ).setdefault(record["params"], []).append(record)
+        logger.info(
+            f"Loaded {sum(len(r) for c in self.calls.values() for r in c.values())} "
+            f"recorded tool calls from {self.path}"
+        )
+
+    @classmethod
+    def from_env(cls) -> "ToolCallReplayer | None":
+        path = os.getenv("TOOL_REPLAY_PATH")
+        if not path:
+            return None
+        return cls(path, float(os.getenv("TOOL_REPLAY_THRESHOLD") or 0.8))
+
+    def _closest(self, recorded: dict[str, list[dict]], params: str) -> tuple[str, float]:
+        matcher = difflib.SequenceMatcher(b=params, autojunk=False)
+        best, best_ratio = "", 0.0
+        for candidate in recorded:
+            matcher.set_seq1(candidate)
+            # Cheap upper bounds first; most candidates are rejected there
+            if matcher.real_quick_ratio() <= best_ratio:
+                continue
+            if matcher.quick_ratio() <= best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        return best, best_ratio
+
+    def replay(
+        self,
+        server_name: str,
+        tool_name: str,
+        params: dict[str, Any] | None,
+    ) -> types.CallToolResult:
+        canonical = canonical_params(params)
+        recorded = self.calls.get((server_name, tool_name), {})
+        if canonical in recorded:
+            match = canonical
+            self.exact += 1
+        else:
+            match, ratio = self._closest(recorded, canonical)
+            if not match or ratio < self.threshold:
+                self.misses += 1
+                logger.warning(
+                    f"No recorded call of {server_name}/{tool_name} matches {canonical}"
+                )
+                return types.CallToolResult(
+                    isError=True,
+                    content=[
+                        types.TextContent(
+                            type="text",
+                            text=f"No recorded result for tool {tool_name} "
+                            f"in {server_name} with these parameters.",
+                        )
+                    ],
+                )
+            self.fuzzy += 1
+            logger.info(
+                f"Replaying {server_name}/{tool_name} {match} for {canonical} "
+                f"(similarity {ratio:.2f})"
+            )
+        # Repeated calls get the recorded results in order, then the last one
+        key = (server_name, tool_name, match)
+        records = recorded[match]
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        record = records[min(served, len(records) - 1)]
+        if "result" not in record:
+            raise RuntimeError(record.get("error") or "Recorded tool call failed")
+        return types.CallToolResult.model_validate(record["result"])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "exact": self.exact,
+            "fuzzy": self.fuzzy,
+            "misses": self.misses,
+        }
@@ -2,16 +2,29 @@ import asyncio
 import json
 import logging
 import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import mcp.types as types
 import yaml
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+from baseline.mcp_copilot.embedding import provider_from_env
+from baseline.mcp_copilot.health import (
+    DEFAULT_HEALTH_PATH,
+    HealthTable,
+    probe_servers,
+)
 from baseline.mcp_copilot.matcher import ToolMatcher
 from baseline.mcp_copilot.mcp_connection import MCPConnection
+from baseline.mcp_copilot.replay import ToolCallRecorder, ToolCallReplayer
 from baseline.mcp_copilot.schemas import Server, ServerConfig
+from baseline.mcp_copilot.tool_cache import ToolResultCache
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -29,6 +42,16 @@ def dump_to_yaml(data: dict[str, Any]) -> str:
     )
 
 
+@dataclass(frozen=True)
+class RouterSnapshot:
+    """Server map and tool index served together; replaced as a whole on reload."""
+
+    config: dict[str, Any]
+    servers: dict[str, Server]
+    matcher: ToolMatcher
+    version: int = 1
+
+
 class Router:
     _default_config_path = PROJECT_ROOT / "config" / "clean_config.json"
 
@@ -36,56 +59,334 @@ class Router:
         self,
         config: dict[str, Any] | Path = _default_config_path,
     ):
-        self.servers = {}
-        if isinstance(config, dict):
-            self.config = config
-        elif isinstance(config, Path):
-            if config.exists():
-                with config.open("r") as f:
-                    self.config = json.load(f)
-            else:
-                logger.warning(
-                    f"Config file not found at {config}. Starting with empty server list."
-                )
-                self.config = {"mcpServers": {}}
-        else:
+        if not isinstance(config, (dict, Path)):
             raise ValueError("Config must be a dictionary or a Path to a JSON file.")
+        self.config_source = config
+
+        # 从环境变量中获取API密钥和数据路径
+        default_data_path = (
+            PROJECT_ROOT
+            / "config"
+            / f"mcp_arg_{os.getenv('EMBEDDING_MODEL')}_{os.getenv('ABSTRACT_MODEL')}.json"
+        )
+        self.data_path = os.getenv("MCP_DATA_PATH", default_data_path)
+        if not self.data_path or not os.path.exists(self.data_path):
+            raise ValueError(
+                f"MCP_DATA_PATH not set or file not found at: {self.data_path}"
+            )
+        self.embedding_timeout = float(os.getenv("EMBEDDING_TIMEOUT") or 0) or None
+        # Shared by every snapshot so reloads keep the warm client/model
+        self.embedding_provider = provider_from_env(
+            api_key=os.getenv("EMBEDDING_API_KEY"),
+            base_url=os.getenv("EMBEDDING_BASE_URL"),
+            timeout=self.embedding_timeout,
+        )
+        # Scoring threads shared by every snapshot, so reloads do not leak pools
+        self.executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="tool-matcher"
+        )
+        self.reload_interval = float(os.getenv("INDEX_RELOAD_INTERVAL") or 0)
+        # Serialized route responses keyed on (index version, normalized blocks)
+        cache_size = int(os.getenv("ROUTE_CACHE_SIZE") or 1024)
+        cache_ttl = float(os.getenv("ROUTE_CACHE_TTL") or 600)
+        self.route_cache = (
+            TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        )
+        self.route_cache_hits = 0
+        self.route_cache_misses = 0
+        # Server health from `python -m baseline.mcp_copilot.health` and/or
+        # the background probe loop
+        self.health = HealthTable(
+            os.getenv("SERVER_HEALTH_PATH") or DEFAULT_HEALTH_PATH,
+            fail_threshold=int(os.getenv("HEALTH_FAIL_THRESHOLD") or 2),
+            slow_ms=float(os.getenv("HEALTH_SLOW_MS") or 10000),
+            max_age=float(os.getenv("HEALTH_MAX_AGE") or 3600),
+            retry_after=float(os.getenv("HEALTH_RETRY_AFTER") or 60),
+        )
+        # Refuse calls to unhealthy servers instead of connecting (opt-in)
+        self.health_fail_fast = os.getenv("HEALTH_FAIL_FAST", "0").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.health_interval = float(os.getenv("HEALTH_PROBE_INTERVAL") or 0)
+        self._health_task: asyncio.Task | None = None
+        # Results of allowlisted read-only tools (opt-in via TOOL_CACHE_CONFIG)
+        self.tool_cache = ToolResultCache.from_env()
+        # Recording of execute-tool calls, and a recording answering them
+        # in place of the live servers (TOOL_RECORD_PATH/TOOL_REPLAY_PATH)
+        self.recorder = ToolCallRecorder.from_env()
+        self.replayer = ToolCallReplayer.from_env()
 
-        for name, config_data in self.config.get("mcpServers", {}).items():
-            self.servers[name] = Server(name=name, config=ServerConfig(**config_data))
+        self._watched_mtimes = self._mtimes()
+        self.snapshot = self._build_snapshot(version=1)
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: asyncio.Task | None = None
 
+        # 新增：初始化一个锁来同步连接过程
+        self.connection_lock = asyncio.Lock()
+
+    @property
+    def config(self) -> dict[str, Any]:
+        return self.snapshot.config
+
+    @property
+    def servers(self) -> dict[str, Server]:
+        return self.snapshot.servers
+
+    @property
+    def matcher(self) -> ToolMatcher:
+        return self.snapshot.matcher
+
+    def _load_config(self) -> dict[str, Any]:
+        if isinstance(self.config_source, dict):
+            return self.config_source
+        if self.config_source.exists():
+            with self.config_source.open("r") as f:
+                return json.load(f)
+        logger.warning(
+            f"Config file not found at {self.config_source}. Starting with empty server list."
+        )
+        return {"mcpServers": {}}
+
+    def _build_matcher(self) -> ToolMatcher:
         # 初始化 ToolMatcher
-        self.matcher = ToolMatcher(
+        matcher = ToolMatcher(
             embedding_model=os.getenv("EMBEDDING_MODEL"),
             dimensions=int(os.getenv("EMBEDDING_DIMENSIONS")),
             top_servers=int(os.getenv("TOP_SERVERS", 5)),
             top_tools=int(os.getenv("TOP_TOOLS", 3)),
+            backend=os.getenv("RETRIEVAL_BACKEND") or "exact",
+            fusion=os.getenv("ROUTE_FUSION") or "none",
+            embedding_timeout=self.embedding_timeout,
+            quantization=os.getenv("EMBEDDING_QUANTIZATION") or "none",
+            executor=self.executor,
         )
+        matcher.set_embedding_provider(self.embedding_provider, owned=False)
+        matcher.load_index(self.data_path)
+        return matcher
 
-        # 从环境变量中获取API密钥和数据路径
-        base_url = os.getenv("EMBEDDING_BASE_URL")
-        api_key = os.getenv("EMBEDDING_API_KEY")
-        default_data_path = (
-            PROJECT_ROOT
-            / "config"
-            / f"mcp_arg_{os.getenv('EMBEDDING_MODEL')}_{os.getenv('ABSTRACT_MODEL')}.json"
+    def _build_snapshot(self, version: int) -> RouterSnapshot:
+        config = self._load_config()
+        servers = {}
+        for name, config_data in config.get("mcpServers", {}).items():
+            servers[name] = Server(name=name, config=ServerConfig(**config_data))
+        return RouterSnapshot(
+            config=config,
+            servers=servers,
+            matcher=self._build_matcher(),
+            version=version,
         )
-        data_path = os.getenv("MCP_DATA_PATH", default_data_path)
 
-        if not api_key:
-            raise ValueError("EMBEDDING_API_KEY environment variable not set.")
-        if not data_path or not os.path.exists(data_path):
-            raise ValueError(f"MCP_DATA_PATH not set or file not found at: {data_path}")
+    def _mtimes(self) -> dict[str, int | None]:
+        paths = [self.data_path]
+        if isinstance(self.config_source, Path):
+            paths.append(self.config_source)
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[str(path)] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[str(path)] = None
+        return mtimes
 
-        self.matcher.setup_openai_client(base_url=base_url, api_key=api_key)
-        self.matcher.load_data(data_path)
+    def _update_snapshot(self, version: int) -> RouterSnapshot | None:
+        """Apply the changes of the index JSON to a copy of the live matcher.
 
-        # 新增：初始化一个锁来同步连接过程
-        self.connection_lock = asyncio.Lock()
+        Servers whose content hash differs from the live index are replaced
+        and servers missing from the JSON removed, so only their rows are
+        re-stacked. Returns None when a full rebuild is needed instead:
+        entries without hashes, or a diff covering most of the index.
+        """
+        current = self.snapshot
+        indexed = {
+            server["server_name"]: server.get("content_hash")
+            for server in current.matcher.servers_data
+        }
+        if None in indexed.values():
+            return None
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        changed = [
+            entry
+            for entry in entries
+            if entry.get("content_hash") is None
+            or indexed.get(entry["server_name"]) != entry["content_hash"]
+        ]
+        removed = sorted(indexed.keys() - {entry["server_name"] for entry in entries})
+        if 2 * (len(changed) + len(removed)) > len(entries):
+            return None
+        logger.info(
+            f"Updating index in place: {len(changed)} changed, {len(removed)} removed"
+        )
+        return RouterSnapshot(
+            config=current.config,
+            servers=current.servers,
+            matcher=current.matcher.updated(changed, removed),
+            version=version,
+        )
+
+    async def reload(self) -> bool:
+        """Rebuild the server map and tool index, then swap them in.
+
+        When only the index JSON changed, its diff is applied to a copy of
+        the live matcher; otherwise the snapshot is rebuilt from disk. Either
+        way the new snapshot is built in a worker thread while the current
+        one keeps serving; calls that already started finish against the
+        snapshot they captured. On failure the current snapshot is kept.
+        """
+        async with self._reload_lock:
+            mtimes = self._mtimes()
+            config_changed = any(
+                mtimes[path] != self._watched_mtimes.get(path)
+                for path in mtimes
+                if path != str(self.data_path)
+            )
+            try:
+                snapshot = None
+                if not config_changed:
+                    snapshot = await asyncio.to_thread(
+                        self._update_snapshot, self.snapshot.version + 1
+                    )
+                if snapshot is None:
+                    snapshot = await asyncio.to_thread(
+                        self._build_snapshot, self.snapshot.version + 1
+                    )
+            except Exception as e:
+                logger.error(
+                    f"Reload failed, keeping index v{self.snapshot.version}: {e}"
+                )
+                return False
+            self._watched_mtimes = mtimes
+            self.snapshot = snapshot
+            logger.info(
+                f"Reloaded index v{snapshot.version}: {len(snapshot.servers)} servers, "
+                f"{len(snapshot.matcher.servers_data)} indexed"
+            )
+            return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if self._mtimes() != self._watched_mtimes:
+                await self.reload()
+
+    def start_reloading(self) -> None:
+        """Reload on SIGHUP, and poll the index files when an interval is set."""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(
+                signal.SIGHUP, lambda: asyncio.ensure_future(self.reload())
+            )
+        except (NotImplementedError, AttributeError, RuntimeError):
+            logger.debug("SIGHUP reload is not supported on this platform.")
+        if self.reload_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def _probe_health(self) -> None:
+        while True:
+            await probe_servers(
+                self.health,
+                self.snapshot.servers,
+                timeout=float(os.getenv("HEALTH_PROBE_TIMEOUT") or 60),
+                concurrency=int(os.getenv("HEALTH_PROBE_CONCURRENCY") or 4),
+            )
+            await asyncio.to_thread(self.health.save)
+            await asyncio.sleep(self.health_interval)
+
+    def start_health_probes(self) -> None:
+        """Probe every server periodically when HEALTH_PROBE_INTERVAL is set."""
+        if self.replayer is not None:
+            # Replaying never connects to the servers
+            return
+        if self.health_interval > 0 and self._health_task is None:
+            self._health_task = asyncio.create_task(self._probe_health())
+
+    def _rank_by_health(self, result: dict[str, Any]) -> dict[str, Any]:
+        """Move tools of slow and unhealthy servers to the end, keeping order."""
+        self.health.refresh()
+        groups = result.get("results") or [result]
+        for group in groups:
+            if group.get("matched_tools"):
+                group["matched_tools"] = sorted(
+                    group["matched_tools"],
+                    key=lambda tool: self.health.rank(tool["server_name"]),
+                )
+        return result
+
+    async def route(self, query: str | list[str]) -> dict[str, Any]:
+        """使用ToolMatcher进行路由，找到最匹配的工具。
+
+        The query may contain several <tool_assistant> blocks, or be a list of
+        queries, which are matched together in one batch.
+        """
+        if isinstance(query, list):
+            query = "\n".join(query)
+        snapshot = self.snapshot
+        return self._rank_by_health(await snapshot.matcher.amatch(query))
+
+    def route_cache_key(
+        self, snapshot: RouterSnapshot, query: str
+    ) -> tuple | None:
+        blocks = snapshot.matcher.extract_tool_assistants(query)
+        if not blocks:
+            return None
+        return (
+            snapshot.version,
+            self.health.version,
+            tuple(
+                (" ".join(server_desc.split()), " ".join(tool_desc.split()))
+                for server_desc, tool_desc in blocks
+            ),
+        )
 
-    async def route(self, query: str) -> dict[str, Any]:
-        """使用ToolMatcher进行路由，找到最匹配的工具。"""
-        return self.matcher.match(query)
+    async def route_yaml(self, query: str | list[str]) -> str:
+        """Route and serialize the result, answering repeats from the cache.
+
+        Identical <tool_assistant> blocks (up to whitespace) against the same
+        index version are served without embedding or scoring. Results
+        computed while the embedding service was unavailable are not cached.
+        """
+        if isinstance(query, list):
+            query = "\n".join(query)
+        snapshot = self.snapshot
+        self.health.refresh()
+        key = self.route_cache_key(snapshot, query)
+        if self.route_cache is not None and key is not None:
+            cached = self.route_cache.get(key)
+            if cached is not None:
+                self.route_cache_hits += 1
+                return cached
+            self.route_cache_misses += 1
+        result = self._rank_by_health(await snapshot.matcher.amatch(query))
+        response = dump_to_yaml(result)
+        degraded = time.monotonic() < snapshot.matcher._embedding_down_until
+        if (
+            self.route_cache is not None
+            and key is not None
+            and result.get("success")
+            and not degraded
+        ):
+            self.route_cache[key] = response
+        return response
+
+    def route_cache_stats(self) -> dict[str, Any]:
+        lookups = self.route_cache_hits + self.route_cache_misses
+        return {
+            "enabled": self.route_cache is not None,
+            "size": len(self.route_cache) if self.route_cache is not None else 0,
+            "maxsize": self.route_cache.maxsize if self.route_cache is not None else 0,
+            "ttl": self.route_cache.ttl if self.route_cache is not None else 0,
+            "hits": self.route_cache_hits,
+            "misses": self.route_cache_misses,
+            "hit_rate": self.route_cache_hits / lookups if lookups else 0.0,
+            "index_version": self.snapshot.version,
+        }
+
+    def tool_cache_stats(self) -> dict[str, Any]:
+        if self.tool_cache is None:
+            return {"enabled": False}
+        return self.tool_cache.stats()
 
     async def call_tool(
         self,
@@ -95,34 +396,109 @@ class Router:
         timeout: int = 300,
     ) -> types.CallToolResult:
         """在指定的服务器上执行工具，每次调用都建立新连接以确保上下文安全。"""
+        if self.replayer is not None:
+            return self.replayer.replay(server_name, tool_name, params)
+        result = None
+        if self.tool_cache is not None:
+            result = self.tool_cache.get(server_name, tool_name, params)
+        if result is None:
+            try:
+                result = await self._call_tool(server_name, tool_name, params, timeout)
+            except Exception as e:
+                if self.recorder is not None:
+                    self.recorder.record(server_name, tool_name, params, error=str(e))
+                raise
+            if self.tool_cache is not None:
+                self.tool_cache.put(server_name, tool_name, params, result)
+        if self.recorder is not None:
+            self.recorder.record(server_name, tool_name, params, result)
+        return result
+
+    async def _call_tool(
+        self,
+        server_name: str,
+        tool_name: str,
+        params: dict[str, Any] | None,
+        timeout: int,
+    ) -> types.CallToolResult:
+        snapshot = self.snapshot
+        self.health.refresh()
+        if self.health_fail_fast and not self.health.allow_call(server_name):
+            # Fail fast instead of waiting for a server known to be down
+            entry = self.health.entries[server_name]
+            return types.CallToolResult(
+                isError=True,
+                content=[
+                    types.TextContent(
+                        type="text",
+                        text=f"Server {server_name} is currently unavailable "
+                        f"({entry.error}). Choose a tool from another server.",
+                    )
+                ],
+            )
         async with self.connection_lock:
-            server_config = self.servers.get(server_name)
+            server_config = snapshot.servers.get(server_name)
             if not server_config:
                 raise ValueError(
                     f"Server '{server_name}' is not defined in the configuration."
                 )
-            # 使用 async with 来管理连接的生命周期
-            # 现在整个过程都在锁的保护下，是线程安全的
-            async with MCPConnection(server_config) as connection:
-                try:
-                    result = await asyncio.wait_for(
-                        connection.call_tool(tool_name, params or {}), timeout=timeout
-                    )
-                    return result
-                except asyncio.TimeoutError:
-                    return types.CallToolResult(
-                        isError=True,
-                        content=[
-                            types.TextContent(
-                                text=f"Tool {tool_name} in {server_name} call timed out."
-                            )
-                        ],
-                    )
+            # 整个过程都在锁的保护下，是线程安全的；连接时间和调用结果计入健康表
+            connection = MCPConnection(server_config)
+            try:
+                await connection.connect()
+            except Exception as e:
+                self.health.record(server_name, False, error=str(e))
+                raise
+            try:
+                result = await asyncio.wait_for(
+                    connection.call_tool(tool_name, params or {}), timeout=timeout
+                )
+                self.health.record(
+                    server_name,
+                    True,
+                    timings=connection.timings,
+                    tool_count=len(connection.server.tools or []),
+                )
+                return result
+            except asyncio.TimeoutError:
+                self.health.record(
+                    server_name,
+                    False,
+                    timings=connection.timings,
+                    tool_count=len(connection.server.tools or []),
+                    error=f"call timed out after {timeout}s",
+                )
+                return types.CallToolResult(
+                    isError=True,
+                    content=[
+                        types.TextContent(
+                            text=f"Tool {tool_name} in {server_name} call timed out."
+                        )
+                    ],
+                )
+            finally:
+                await connection.aclose()
 
     async def aclose(self):
-        pass
+        if self._watch_task:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self.health.dirty:
+            # Keep checks made by probes and execute-tool for the next run
+            self.health.refresh()
+            self.health.save()
+        if self.replayer is not None:
+            logger.info(f"Replayed tool calls: {self.replayer.stats()}")
+        await self.matcher.aclose()
+        await self.embedding_provider.aclose()
+        self.executor.shutdown(wait=False)
 
     async def __aenter__(self):
+        self.start_reloading()
+        self.start_health_probes()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
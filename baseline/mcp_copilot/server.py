@@ -16,12 +16,16 @@ def serve(config: dict[str, Any] | Path = Router._default_config_path) -> None:
         config: MCP Server config for Router
     """
     print("Indexing MCP servers and tools...")
-    asyncio.run(run_generation())
+    # Servers that failed to index are retried by arg_generation, not on startup
+    asyncio.run(run_generation(retry_failed=False))
+
+    state = {}
 
     @asynccontextmanager
     async def copilot_lifespan(server: FastMCP) -> AsyncIterator[dict]:
         """Lifespan context manager for the Copilot server."""
         async with Router(config) as router:
+            state["router"] = router
             yield {"router": router}
 
     print("Starting MCP Copilot server...")
@@ -43,6 +47,7 @@ def serve(config: dict[str, Any] | Path = Router._default_config_path) -> None:
         server: ... # Platform/permission domain
         tool: ... # Operation type + target
         </tool_assistant>
+    To find tools for several needs at once, include one <tool_assistant> block per need in the same query; the results are grouped per block.
     """
         ),
     )
@@ -52,8 +57,32 @@ def serve(config: dict[str, Any] | Path = Router._default_config_path) -> None:
     ) -> types.CallToolResult:
         """Route user query to appropriate servers and tools."""
         router: Router = ctx.request_context.lifespan_context["router"]
-        result = await router.route(query)
-        return dump_to_yaml(result)
+        return await router.route_yaml(query)
+
+    # Exposed as a resource rather than a tool so the agent's tool list is unchanged
+    @server.resource(
+        "copilot://stats/route-cache",
+        name="route-cache-stats",
+        description="Hit/miss counters of the route result cache.",
+        mime_type="application/yaml",
+    )
+    def route_cache_stats() -> str:
+        router: Router | None = state.get("router")
+        if router is None:
+            return dump_to_yaml({"enabled": False})
+        return dump_to_yaml(router.route_cache_stats())
+
+    @server.resource(
+        "copilot://stats/tool-cache",
+        name="tool-cache-stats",
+        description="Hit/miss counters of the tool call result cache.",
+        mime_type="application/yaml",
+    )
+    def tool_cache_stats() -> str:
+        router: Router | None = state.get("router")
+        if router is None:
+            return dump_to_yaml({"enabled": False})
+        return dump_to_yaml(router.tool_cache_stats())
 
     @server.tool(
         name="execute-tool",
@@ -0,0 +1,145 @@
+"""Disk-backed cache of tool call results for read-only tools.
+
+Only tools on the allowlist are cached. The allowlist is a JSON file named
+by ``TOOL_CACHE_CONFIG``; its keys are ``server/tool`` patterns (``*`` and
+``?`` wildcards) and its values the lifetime of a result in seconds, or
+``null`` for results that never expire:
+
+    {
+        "path": "./baseline/mcp_copilot/config/tool_cache",
+        "tools": {
+            "fetch/fetch": 86400,
+            "arxiv-mcp-server/*": null
+        }
+    }
+
+Results are keyed on the server, the tool and the canonical JSON of the
+parameters (sorted keys, ``null`` parameters dropped), and stored one JSON
+file per key so several copilot processes can share the cache. Error
+results are never cached.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import mcp.types as types
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "config" / "tool_cache"
+
+
+def canonical_params(params: dict[str, Any] | None) -> str:
+    params = {key: value for key, value in (params or {}).items() if value is not None}
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class ToolResultCache:
+    def __init__(
+        self,
+        tools: dict[str, float | None],
+        path: str | Path = DEFAULT_CACHE_PATH,
+    ):
+        self.tools = tools
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ToolResultCache | None":
+        """Cache configured by TOOL_CACHE_CONFIG, or None when it is unset."""
+        config_path = os.getenv("TOOL_CACHE_CONFIG")
+        if not config_path:
+            return None
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        path = os.getenv("TOOL_CACHE_PATH") or config.get("path") or DEFAULT_CACHE_PATH
+        return cls(config.get("tools", {}), path)
+
+    def ttl(self, server_name: str, tool_name: str) -> tuple[bool, float | None]:
+        """Whether the tool is cacheable, and the lifetime of its results."""
+        name = f"{server_name}/{tool_name}"
+        for pattern, ttl in self.tools.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return True, ttl
+        return False, None
+
+    def _file(self, server_name: str, tool_name: str, params: str) -> Path:
+        key = json.dumps([server_name, tool_name, params], ensure_ascii=False)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.path / digest[:2] / f"{digest}.json"
+
+    def get(
+        self,
+        server_name: str,
+        tool_name: str,
+        params: dict[str, Any] | None,
+    ) -> types.CallToolResult | None:
+        cacheable, ttl = self.ttl(server_name, tool_name)
+        if not cacheable:
+            return None
+        canonical = canonical_params(params)
+        path = self._file(server_name, tool_name, canonical)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read cached result {path}: {e}")
+            entry = None
+        age = time.time() - entry["stored_at"] if entry else 0.0
+        if entry is None or (ttl is not None and age > ttl):
+            self.misses += 1
+            logger.debug(f"Tool cache miss: {server_name}/{tool_name} {canonical}")
+            return None
+        self.hits += 1
+        logger.info(
+            f"Tool cache hit: {server_name}/{tool_name} {canonical} (age {age:.0f}s)"
+        )
+        return types.CallToolResult.model_validate(entry["result"])
+
+    def put(
+        self,
+        server_name: str,
+        tool_name: str,
+        params: dict[str, Any] | None,
+        result: types.CallToolResult,
+    ) -> None:
+        cacheable, _ = self.ttl(server_name, tool_name)
+        if not cacheable or result.isError:
+            return
+        canonical = canonical_params(params)
+        path = self._file(server_name, tool_name, canonical)
+        entry = {
+            "server_name": server_name,
+            "tool_name": tool_name,
+            "params": canonical,
+            "stored_at": time.time(),
+            "result": result.model_dump(mode="json", by_alias=True, exclude_none=True),
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache result of {server_name}/{tool_name}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "path": str(self.path),
+            "tools": self.tools,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
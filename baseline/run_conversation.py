@@ -1,4 +1,5 @@
 import asyncio
+import itertools
 import json
 import logging
 import os
@@ -15,6 +16,13 @@ import uuid
 from utils.clogger import _set_logger
 from utils.llm_api import ChatModel
 from utils.mcp_client import MCPClient
+from utils.trajectory_io import (
+    append_results,
+    is_jsonl,
+    iter_results,
+    read_task_ids,
+    write_results,
+)
 
 _set_logger(
     exp_dir=pathlib.Path("./logs"),
@@ -43,12 +51,32 @@ def parse_args():
         default=CONVERSATION_RESULTS_FILE,
         help="Path to the output conversation results file.",
     )
+    parser.add_argument(
+        "--record_tools",
+        type=str,
+        default=None,
+        help="Append every execute-tool call and its result to this JSONL file.",
+    )
+    parser.add_argument(
+        "--replay_tools",
+        type=str,
+        default=None,
+        help="Answer execute-tool calls from this recording instead of the MCP servers.",
+    )
+    parser.add_argument(
+        "--replay_threshold",
+        type=float,
+        default=0.8,
+        help="Minimum parameter similarity for replaying a recorded call that "
+        "does not match exactly (1 disables fuzzy matching).",
+    )
     return parser.parse_args()
 
 
 class LoggingMCPClient(MCPClient):
-    def __init__(self):
+    def __init__(self, copilot_env: Optional[dict] = None):
         super().__init__(timeout=180, max_sessions=9999)
+        self.copilot_env = copilot_env
         self.chat_model = ChatModel(
             model_name=os.getenv("MODEL"),
             api_key=os.getenv("OPENAI_API_KEY"),
@@ -63,6 +91,7 @@ class LoggingMCPClient(MCPClient):
                         "mcp-copilot": {
                             "command": "python",
                             "args": ["-m", "baseline.mcp_copilot"],
+                            "env": self.copilot_env,
                         },
                     }
                 },
@@ -197,15 +226,19 @@ async def main(args):
     with open(args.input_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     logger.info(f"len(queries): {len(data)}")
-    client = LoggingMCPClient()
+    copilot_env = {}
+    if args.record_tools:
+        copilot_env["TOOL_RECORD_PATH"] = os.path.abspath(args.record_tools)
+    if args.replay_tools:
+        if not pathlib.Path(args.replay_tools).exists():
+            logger.error(f"Tool call recording {args.replay_tools} does not exist.")
+            return
+        copilot_env["TOOL_REPLAY_PATH"] = os.path.abspath(args.replay_tools)
+        copilot_env["TOOL_REPLAY_THRESHOLD"] = str(args.replay_threshold)
+    client = LoggingMCPClient(copilot_env or None)
     await client.connect_copilot()
-    if os.path.exists(args.output_path):
-        with open(args.output_path, "r", encoding="utf-8") as f:
-            all_results = json.load(f)
-        exist_ids = {entry["task_id"] for entry in all_results}
-    else:
-        all_results = []
-        exist_ids = set()
+    exist_ids = read_task_ids(args.output_path)
+    new_results = []
     error_queries = set()
     try:
         for entry in tqdm(data):
@@ -219,16 +252,26 @@ async def main(args):
                 logger.info(f"{response}")
                 entry["response"] = response
                 entry["messages"] = messages
-                all_results.append(entry)
+                # JSONL outputs are checkpointed per task
+                if is_jsonl(args.output_path):
+                    append_results(args.output_path, [entry])
+                else:
+                    new_results.append(entry)
 
             except Exception:
                 error_queries.add(query)
                 logger.error(traceback.format_exc())
     finally:
         await client.cleanup()
-        os.makedirs(os.path.dirname(args.output_path), exist_ok=True)
-        with open(args.output_path, "w", encoding="utf-8") as f:
-            json.dump(all_results, f, indent=4, ensure_ascii=False)
+        if new_results or not os.path.exists(args.output_path):
+            existing_results = (
+                iter_results(args.output_path)
+                if os.path.exists(args.output_path)
+                else []
+            )
+            write_results(
+                args.output_path, itertools.chain(existing_results, new_results)
+            )
 
 
 if __name__ == "__main__":
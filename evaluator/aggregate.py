@@ -0,0 +1,174 @@
+"""Columnar aggregation of judge verdicts.
+
+All verdicts are loaded into a single DataFrame with one row per
+(model, file, task_id) so success rates, human agreement, Cohen's kappa and
+bootstrap confidence intervals are computed with vectorized group-bys instead
+of per-file Python loops.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.trajectory_io import iter_results
+
+VERDICT_COLUMNS = ["model", "file", "task_id", "category", "reward", "judge"]
+RESULT_SUFFIXES = (".json", ".jsonl", ".parquet")
+
+
+def _result_name(path: Path) -> str:
+    return path.name.removesuffix(path.suffix)
+
+
+def _group_key(key):
+    # pandas yields 1-tuples when grouping by a single-element list
+    return key[0] if isinstance(key, tuple) and len(key) == 1 else key
+
+
+def find_result_files(
+    result_dirs: Iterable[str | Path], file_name: Optional[str] = None
+) -> List[Path]:
+    """List judge result files under each evaluator output directory."""
+    files = []
+    for result_dir in result_dirs:
+        result_dir = Path(result_dir)
+        if not result_dir.is_dir():
+            continue
+        for file in sorted(os.listdir(result_dir)):
+            if not file.endswith(RESULT_SUFFIXES) or "example" in file:
+                continue
+            if file_name is not None and _result_name(Path(file)) != file_name:
+                continue
+            files.append(result_dir / file)
+    return files
+
+
+def load_verdicts(files: Iterable[str | Path]) -> pd.DataFrame:
+    """Load judge results into one table.
+
+    ``model`` is the judge model (the output sub-directory) and ``file`` is
+    the evaluated trajectory file name without suffix. Duplicate task ids in a
+    file keep the last verdict.
+    """
+    columns: Dict[str, list] = {column: [] for column in VERDICT_COLUMNS}
+    for path in files:
+        path = Path(path)
+        model, file = path.parent.name, _result_name(path)
+        for result in iter_results(
+            path, fields=("task_id", "category", "reward", "judge")
+        ):
+            columns["model"].append(model)
+            columns["file"].append(file)
+            columns["task_id"].append(result["task_id"])
+            columns["category"].append(result.get("category"))
+            columns["reward"].append(result.get("reward", 0))
+            columns["judge"].append(result.get("judge", ""))
+    df = pd.DataFrame(columns)
+    df = df.drop_duplicates(subset=["model", "file", "task_id"], keep="last")
+    df["success"] = df["reward"].astype(float) > 0
+    for column in ("model", "file", "category"):
+        df[column] = df[column].astype("category")
+    return df.reset_index(drop=True)
+
+
+def load_human_verdicts(annotation_path: str | Path) -> pd.Series:
+    """Return a boolean series of human success verdicts indexed by task id."""
+    task_ids, verdicts = [], []
+    for item in iter_results(annotation_path, fields=("task_id", "task_success")):
+        task_ids.append(item["task_id"])
+        verdicts.append("success" in str(item["task_success"]).lower())
+    human = pd.Series(verdicts, index=pd.Index(task_ids, name="task_id"))
+    return human[~human.index.duplicated(keep="last")]
+
+
+def success_rates(df: pd.DataFrame, by: Sequence[str] = ("file",)) -> pd.DataFrame:
+    """Per-category and overall success rates in percent."""
+    by = list(by)
+    per_category = (
+        df.groupby(by + ["category"], observed=True)["success"].mean().unstack()
+    )
+    overall = df.groupby(by, observed=True)["success"].mean().rename("overall")
+    rates = per_category.join(overall)
+    return (100 * rates).round(2)
+
+
+def cohen_kappa(pred: np.ndarray, truth: np.ndarray) -> float:
+    """Cohen's kappa between two boolean verdict vectors."""
+    pred = np.asarray(pred, dtype=bool)
+    truth = np.asarray(truth, dtype=bool)
+    if len(pred) == 0:
+        return float("nan")
+    p_o = np.mean(pred == truth)
+    p_pred, p_truth = pred.mean(), truth.mean()
+    p_e = p_pred * p_truth + (1 - p_pred) * (1 - p_truth)
+    if p_e == 1:
+        return 1.0 if p_o == 1 else 0.0
+    return float((p_o - p_e) / (1 - p_e))
+
+
+def bootstrap_ci(
+    values: np.ndarray,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """Percentile bootstrap confidence interval of the mean of ``values``."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return float("nan"), float("nan")
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, len(values), size=(n_boot, len(values)))
+    means = values[samples].mean(axis=1)
+    low, high = np.quantile(means, [alpha / 2, 1 - alpha / 2])
+    return float(low), float(high)
+
+
+def success_rate_ci(
+    df: pd.DataFrame,
+    by: Sequence[str] = ("file",),
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """Bootstrap confidence intervals of the overall success rate in percent."""
+    rows = {}
+    for key, group in df.groupby(list(by), observed=True)["success"]:
+        low, high = bootstrap_ci(group.to_numpy(), n_boot=n_boot, alpha=alpha)
+        rows[_group_key(key)] = {"ci_low": low, "ci_high": high}
+    ci = pd.DataFrame.from_dict(rows, orient="index")
+    return (100 * ci).round(2)
+
+
+def human_agreement(
+    df: pd.DataFrame,
+    human: pd.Series,
+    by: Sequence[str] = ("model",),
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """Agreement of every judge with the human verdicts.
+
+    Rates are taken over all human-annotated tasks; a task the judge did not
+    evaluate counts as a disagreement, as in the original agreement table.
+    """
+    by = list(by)
+    n_human = len(human)
+    merged = df.join(human.rename("human"), on="task_id", how="inner")
+    merged["agree"] = merged["success"] == merged["human"]
+    rows = {}
+    for key, group in merged.groupby(by, observed=True):
+        # Pad missing tasks with disagreements so the CI matches the rate.
+        agree = np.zeros(n_human)
+        agree[: len(group)] = group["agree"].to_numpy()
+        low, high = bootstrap_ci(agree, n_boot=n_boot, alpha=alpha)
+        rows[_group_key(key)] = {
+            "human_agreement": 100 * group["agree"].sum() / n_human,
+            "success_rate": 100 * group["success"].sum() / n_human,
+            "cohen_kappa": cohen_kappa(group["success"], group["human"]),
+            "agreement_ci_low": 100 * low,
+            "agreement_ci_high": 100 * high,
+        }
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    return table.round(2)
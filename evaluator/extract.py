@@ -0,0 +1,142 @@
+"""Pre-extraction of agent trajectories into compact judge records.
+
+Every trajectory is walked once and converted into a normalized record with
+the final answer, the ordered ``execute-tool`` calls with parsed arguments,
+the ``route`` queries and the size of every tool result. The judge and other
+analyses consume these records instead of re-parsing raw chats.
+
+Usage:
+    python -m evaluator.extract ./baseline/output/*.json --output_dir ./evaluator/records
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.trajectory_io import extract_tool_calls, iter_results, write_results
+
+RECORDS_SUFFIX = ".records.jsonl"
+
+
+def is_records_file(path: str | Path) -> bool:
+    return str(path).endswith(RECORDS_SUFFIX)
+
+
+def extract_final_answer(messages: List[Dict[str, Any]]) -> str:
+    """Return the last assistant message that is not a tool call."""
+    response = ""
+    for message in messages:
+        if message.get("role") != "assistant":
+            continue
+        content = message.get("content", None)
+        if content and not message.get("tool_calls") and not message.get(
+            "function_call"
+        ):
+            response = content
+    return response
+
+
+def extract_route_queries(messages: List[Dict[str, Any]]) -> List[str]:
+    route_queries = []
+    for message in messages:
+        if message.get("role") != "assistant":
+            continue
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function", {})
+            if function.get("name") != "route":
+                continue
+            try:
+                query = json.loads(function.get("arguments", "")).get("query", "")
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                query = function.get("arguments", "")
+            route_queries.append(query)
+    return route_queries
+
+
+def extract_tool_result_sizes(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    call_names = {}
+    for message in messages:
+        for tool_call in message.get("tool_calls") or []:
+            call_names[tool_call.get("id")] = tool_call.get("function", {}).get("name")
+    sizes = []
+    for message in messages:
+        if message.get("role") != "tool":
+            continue
+        tool_call_id = message.get("tool_call_id")
+        sizes.append(
+            {
+                "tool_call_id": tool_call_id,
+                "name": call_names.get(tool_call_id),
+                "size": len(str(message.get("content") or "")),
+            }
+        )
+    return sizes
+
+
+def extract_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one trajectory entry into a compact record."""
+    messages = entry.get("messages") or []
+    metadata = entry.get("Annotator Metadata") or {}
+    return {
+        "task_id": entry["task_id"],
+        "question": entry.get("Question", entry.get("question")),
+        "category": entry.get("category"),
+        "steps": metadata.get("Steps"),
+        "final_answer": extract_final_answer(messages),
+        "tool_calls": extract_tool_calls(messages),
+        "route_queries": extract_route_queries(messages),
+        "tool_result_sizes": extract_tool_result_sizes(messages),
+        "num_messages": len(messages),
+    }
+
+
+def iter_records(path: str | Path):
+    """Yield records from a records file, or extract them from raw trajectories."""
+    if is_records_file(path):
+        yield from iter_results(path)
+    else:
+        for entry in iter_results(path):
+            yield extract_record(entry)
+
+
+def records_path_for(path: str | Path, output_dir: Optional[str | Path] = None) -> Path:
+    path = Path(path)
+    name = path.name.removesuffix(path.suffix) + RECORDS_SUFFIX
+    return Path(output_dir) / name if output_dir else path.with_name(name)
+
+
+def extract_file(path: str | Path, output_dir: Optional[str | Path] = None) -> str:
+    output_path = records_path_for(path, output_dir)
+    write_results(output_path, (extract_record(entry) for entry in iter_results(path)))
+    return str(output_path)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Extract judge records")
+    parser.add_argument("paths", nargs="+", help="Trajectory result files.")
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default=None,
+        help="Directory for the records files (defaults to next to each input).",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    paths = [path for path in args.paths if not is_records_file(path)]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(extract_file, path, args.output_dir): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                print(f"Extracted {futures[future]} -> {future.result()}")
+            except Exception as e:
+                print(f"Error extracting {futures[future]}: {e}")
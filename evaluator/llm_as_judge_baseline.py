@@ -1,4 +1,5 @@
 import argparse
+import itertools
 import json
 import logging
 import os
@@ -9,8 +10,16 @@ import re
 import dotenv
 from tqdm import tqdm
 
+from evaluator.extract import RECORDS_SUFFIX, extract_record, is_records_file
 from utils.clogger import _set_logger
-from utils.llm_api import ChatModel
+from utils.llm_api import ChatModel, CompletionStore, RecordingChatModel
+from utils.trajectory_io import (
+    append_results,
+    is_jsonl,
+    iter_results,
+    read_task_ids,
+    write_results,
+)
 
 dotenv.load_dotenv()
 _set_logger(
@@ -126,6 +135,26 @@ def format_tool_descriptions(tool_map, server_name, tool_name):
     return tool_descriptions.strip()
 
 
+def parse_judge_response(res_text):
+    """Extract thoughts, verdict and reward from a judge completion."""
+    pattern = r"Thoughts:\s*(.+?)\s*Status:\s*(\w+)"
+    match = re.search(pattern, res_text, re.DOTALL)
+    if match:
+        thoughts = match.group(1).strip()
+        judge = match.group(2).strip()
+    else:
+        thoughts = "Thoughts extract failed."
+        judge = res_text
+    reward = 1
+    if "success" in judge.lower():
+        reward *= 1
+    elif "failure" in judge.lower():
+        reward *= 0
+    else:
+        reward *= 0
+    return thoughts, judge, reward
+
+
 def get_args():
     parser = argparse.ArgumentParser(description="LLM as Judge Baseline")
     parser.add_argument("--tools_path", type=str, default="./tools/LiveMCPTool/tools.json")
@@ -141,25 +170,53 @@ def get_args():
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--completion_store",
+        type=str,
+        default=None,
+        help="JSONL store of judge completions (default: ./evaluator/completions/<model>.jsonl).",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        default=False,
+        help="Record every judge request/response pair to the completion store.",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        default=False,
+        help="Serve judge completions from the completion store without network calls. "
+        "Use a fresh --output_dir, as tasks already in the output are skipped.",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = get_args()
-    output_name = args.trajectory_path.split("/")[-1]
-    output_name = output_name.removesuffix(".json")
+    output_name = pathlib.Path(args.trajectory_path).name
+    if is_records_file(output_name):
+        output_name = output_name.removesuffix(RECORDS_SUFFIX) + ".jsonl"
     output_path = os.path.join(
         args.output_dir,
         f"{args.model_name.replace('/', '_')}",
-        f"{output_name}.json",
-    )
-    chat_model = ChatModel(
-        model_name=args.model_name,
-        model_url=os.getenv("BASE_URL"),
-        api_key=os.getenv("OPENAI_API_KEY"),
+        output_name,
     )
-    with open(args.trajectory_path, "r") as f:
-        trajectory = json.load(f)
+    chat_model = None
+    if not args.replay:
+        chat_model = ChatModel(
+            model_name=args.model_name,
+            model_url=os.getenv("BASE_URL"),
+            api_key=os.getenv("OPENAI_API_KEY"),
+        )
+    if args.record or args.replay:
+        completion_store = CompletionStore(
+            args.completion_store
+            or os.path.join(
+                "./evaluator/completions", f"{args.model_name.replace('/', '_')}.jsonl"
+            )
+        )
+        chat_model = RecordingChatModel(completion_store, args.model_name, chat_model)
     with open(args.tools_path, "r") as f:
         tool_servers = json.load(f)
     tool_map = defaultdict(dict)
@@ -172,57 +229,38 @@ if __name__ == "__main__":
                     "description": tl["description"],
                     "inputSchema": tl["inputSchema"],
                 }
-    if os.path.exists(output_path):
-        with open(output_path, "r") as f:
-            judge_results = json.load(f)
-            exisiting_ids = {entry["task_id"] for entry in judge_results}
+    exisiting_ids = read_task_ids(output_path)
+    judge_results = []
+    if is_records_file(args.trajectory_path):
+        trajectory = ((record, None) for record in iter_results(args.trajectory_path))
     else:
-        judge_results = []
-        exisiting_ids = set()
-    for entry in tqdm(trajectory):
+        trajectory = (
+            (extract_record(entry), entry.get("messages"))
+            for entry in iter_results(args.trajectory_path)
+        )
+    for record, raw_messages in tqdm(trajectory):
         try:
-            task_id = entry["task_id"]
+            task_id = record["task_id"]
             if task_id in exisiting_ids:
                 continue
-            messages = entry["messages"]
-            response = ""
-            tool_calls = []
+            response = record["final_answer"]
+            tool_calls = [tool_call["arguments"] for tool_call in record["tool_calls"]]
             if not args.auto_key_points:
-                steps = entry["Annotator Metadata"]["Steps"]
+                steps = record["steps"]
+                # Skip like the raw trajectories did, instead of silently
+                # generating key points for this task
+                if steps is None:
+                    raise KeyError("Annotator Metadata Steps")
             else:
                 steps = None
-            tool_descriptions = ""
-            for message in messages:
-                if message["role"] == "assistant":
-                    message_content = message.get("content", None)
-                    message_tool_calls = message.get("tool_calls", None)
-                    message_function_call = message.get("function_call", None)
-                    if (
-                        message_content
-                        and not message_tool_calls
-                        and not message_function_call
-                    ):
-                        response = message_content
-                    elif message_tool_calls or message_function_call:
-                        # Extract tool calls or function calls
-                        message_tool_calls = message.get(
-                            "tool_calls", []
-                        ) or message.get("function_call", [])
-                        for tool_call in message_tool_calls:
-                            function = tool_call["function"]
-                            if function.get("name") == "execute-tool":
-                                tool_calls.append(function["arguments"])
-                                try:
-                                    tool_config = json.loads(function["arguments"])
-                                except json.JSONDecodeError:
-                                    tool_config = {}
-                                tool_descriptions += format_tool_descriptions(
-                                    tool_map,
-                                    tool_config.get("server_name", "not_given"),
-                                    tool_config.get("tool_name", "not_given"),
-                                )
+            tool_descriptions = "".join(
+                format_tool_descriptions(
+                    tool_map, tool_call["server_name"], tool_call["tool_name"]
+                )
+                for tool_call in record["tool_calls"]
+            )
             messages, text, system_msg = livemcp_eval(
-                entry["Question"],
+                record["question"],
                 response,
                 tool_calls,
                 steps,
@@ -231,36 +269,28 @@ if __name__ == "__main__":
             )
             res = chat_model.chat_with_retry(message=messages)
             res_text = res.choices[0].message.content
-            pattern = r"Thoughts:\s*(.+?)\s*Status:\s*(\w+)"
-            match = re.search(pattern, res_text, re.DOTALL)
-            if match:
-                thoughts = match.group(1).strip()
-                judge = match.group(2).strip()
-            else:
-                thoughts = "Thoughts extract failed."
-                judge = res_text
-            reward = 1
-            if "success" in judge.lower():
-                reward *= 1
-            elif "failure" in judge.lower():
-                reward *= 0
+            thoughts, judge, reward = parse_judge_response(res_text)
+            judge_result = {
+                "task_id": task_id,
+                "question": record["question"],
+                "judge": judge,
+                "judge_reason": thoughts,
+                "reward": reward,
+                "category": record["category"],
+                "response": response,
+            }
+            if raw_messages is not None:
+                judge_result["messages"] = raw_messages
+            # JSONL outputs are checkpointed per verdict
+            if is_jsonl(output_path):
+                append_results(output_path, [judge_result])
             else:
-                reward *= 0
-            judge_results.append(
-                {
-                    "task_id": task_id,
-                    "question": entry["Question"],
-                    "judge": judge,
-                    "judge_reason": thoughts,
-                    "reward": reward,
-                    "category": entry["category"],
-                    "response": response,
-                    "messages": entry["messages"],
-                }
-            )
+                judge_results.append(judge_result)
         except Exception as e:
             logger.error(f"Error processing entry {task_id}: {e}")
             continue
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w") as f:
-        json.dump(judge_results, f, indent=4, ensure_ascii=False)
+    if judge_results:
+        existing_results = (
+            iter_results(output_path) if os.path.exists(output_path) else []
+        )
+        write_results(output_path, itertools.chain(existing_results, judge_results))
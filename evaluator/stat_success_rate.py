@@ -1,8 +1,12 @@
-import json
 import argparse
-from collections import defaultdict
 import os
-import pandas as pd
+
+from evaluator.aggregate import (
+    find_result_files,
+    load_verdicts,
+    success_rate_ci,
+    success_rates,
+)
 
 
 def get_args():
@@ -10,54 +14,45 @@ def get_args():
     parser.add_argument(
         "--result_path",
         type=str,
-        default="./evaluator/output/deepseek_deepseek-chat-v3-0324",
+        nargs="+",
+        default=["./evaluator/output/deepseek_deepseek-chat-v3-0324"],
+        help="One or more evaluator output directories.",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Number of bootstrap resamples for overall confidence intervals.",
     )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = get_args()
-    res = defaultdict(dict)
-    for file in os.listdir(args.result_path):
-        if not file.endswith(".json") or "example" in file:
-            continue
-        name = file.removesuffix(".json")
-        single_result_path = os.path.join(args.result_path, file)
-        with open(single_result_path, "r") as f:
-            results = json.load(f)
-        res_dict = defaultdict(dict)
-        for result in results:
-            task_id = result["task_id"]
-            category = result["category"]
-            reward = result["reward"]
-            res_dict[category][task_id] = reward
-        for category in res_dict:
-            success_count = sum(
-                1 for reward in res_dict[category].values() if reward > 0
-            )
-            total_count = len(res_dict[category])
-            success_rate = success_count / total_count if total_count > 0 else 0
-            res[name][category] = round(100 * success_rate, 2)
-            print(
-                f"Category: {category}, Success Rate: {success_rate * 100:.2f}, Count: {total_count}, Success Count: {success_count}"
-            )
-        all_success_count = sum(
-            1
-            for category in res_dict
-            for reward in res_dict[category].values()
-            if reward > 0
-        )
-        all_total_count = sum(len(res_dict[category]) for category in res_dict)
-        all_success_rate = (
-            all_success_count / all_total_count if all_total_count > 0 else 0
-        )
-        res[name]["overall"] = round(100 * all_success_rate, 2)
+    df = load_verdicts(find_result_files(args.result_path))
+    if df.empty:
+        print("No result files found.")
+        raise SystemExit(0)
+    counts = df.groupby(["model", "file", "category"], observed=True)["success"].agg(
+        ["size", "sum"]
+    )
+    for (model, name, category), row in counts.iterrows():
         print(
-            f"Overall Success Rate: {all_success_rate * 100:.2f}, Count: {all_total_count}, Success Count: {all_success_count}"
+            f"[{model}/{name}] Category: {category}, Success Rate: {100 * row['sum'] / row['size']:.2f}, Count: {row['size']}, Success Count: {row['sum']}"
         )
-    df = pd.DataFrame(res).T
-    df.index.name = "Model"
-    # sort by overall success rate
-    df = df.sort_values(by="overall", ascending=False)
-    df.to_csv(os.path.join(args.result_path, "success_rate.csv"), sep="\t")
-    print("Success rates saved to success_rate.csv")
+    for result_path in args.result_path:
+        model = os.path.basename(os.path.normpath(result_path))
+        model_df = df[df["model"] == model]
+        if model_df.empty:
+            continue
+        res = success_rates(model_df, by=["file"])
+        if args.bootstrap:
+            res = res.join(success_rate_ci(model_df, by=["file"], n_boot=args.bootstrap))
+        res.index.name = "Model"
+        res.columns.name = None
+        # sort by overall success rate
+        res = res.sort_values(by="overall", ascending=False)
+        for name, overall in res["overall"].items():
+            print(f"[{model}/{name}] Overall Success Rate: {overall:.2f}")
+        res.to_csv(os.path.join(result_path, "success_rate.csv"), sep="\t")
+        print(f"Success rates saved to {os.path.join(result_path, 'success_rate.csv')}")
@@ -0,0 +1,370 @@
+"""Build the MCP catalog artifacts, re-running only the stale stages.
+
+Stages and the files they connect:
+
+    all_config.json --clean_config--> clean_config.json
+    all_config.json --tools---------> tools.json
+    tools.json -----index-----------> mcp_arg_*.json
+    mcp_arg_*.json --compile--------> mcp_arg_*.json.<quantization>.index/
+    all_config.json --readme--------> readme/  (only when requested)
+
+A stage runs when the content hash of one of its inputs or its parameters
+differs from its last successful run, when an output is missing, or when
+its last run was incomplete: the crawl and index commands exit with 2 when
+some servers failed, and those are retried by the next build. The
+hashes are kept in ``.catalog_build.json`` next to all_config.json. Stages
+whose dependencies are done run in parallel, and the duration of every
+stage is reported.
+
+Usage:
+    uv run tools/build_catalog.py
+    uv run tools/build_catalog.py index compile --quantization int8
+    uv run tools/build_catalog.py --force tools --crawl_args="--workers 4 --refresh"
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shlex
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from tabulate import tabulate
+
+from creat_clean_config import create_clean_config
+
+load_dotenv()
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STATE_FILE = ".catalog_build.json"
+STAGES = ["clean_config", "tools", "index", "compile", "readme"]
+DEFAULT_STAGES = STAGES[:4]
+# Exit code of a command that produced its outputs but left some servers out
+EXIT_INCOMPLETE = 2
+
+
+def file_hash(path: Path) -> Optional[str]:
+    """Content hash of a file, or of ``meta.json`` for a compiled index."""
+    if path.is_dir():
+        path = path / "meta.json"
+    if not path.exists():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def params_hash(params: Dict[str, Any]) -> str:
+    data = json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+@dataclass
+class Stage:
+    name: str
+    inputs: List[Path]
+    outputs: List[Path]
+    run: Callable[[], Awaitable[None]]
+    deps: List[str] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+class IncompleteStage(RuntimeError):
+    """The stage wrote usable outputs but has to run again."""
+
+
+async def run_command(*args: str) -> None:
+    process = await asyncio.create_subprocess_exec(*args, cwd=REPO_ROOT)
+    if await process.wait() == EXIT_INCOMPLETE:
+        raise IncompleteStage("some servers failed and will be retried")
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[1]} {args[2]} exited with {process.returncode}")
+
+
+class CatalogBuild:
+    def __init__(self, stages: List[Stage], state_path: Path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if state_path.exists():
+            with open(state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        self.report: Dict[str, Dict[str, Any]] = {}
+
+    def stale_reason(self, stage: Stage) -> Optional[str]:
+        record = self.state.get(stage.name)
+        if record is None:
+            return "never built"
+        if record.get("incomplete"):
+            return "last run incomplete"
+        if record.get("params") != params_hash(stage.params):
+            return "parameters changed"
+        for path in stage.inputs:
+            if record.get("inputs", {}).get(str(path)) != file_hash(path):
+                return f"{path.name} changed"
+        for path in stage.outputs:
+            if not path.exists():
+                return f"{path.name} missing"
+        return None
+
+    def _save_state(self) -> None:
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    async def _build(
+        self,
+        stage: Stage,
+        tasks: Dict[str, asyncio.Task],
+        force: List[str],
+        dry_run: bool,
+    ) -> str:
+        for dep in stage.deps:
+            if dep in tasks and await tasks[dep] in ("failed", "blocked"):
+                self.report[stage.name] = {"status": "blocked", "reason": dep}
+                return "blocked"
+
+        reason = "forced" if stage.name in force else self.stale_reason(stage)
+        if reason is None or dry_run:
+            status = "up to date" if reason is None else "stale"
+            self.report[stage.name] = {"status": status, "reason": reason or ""}
+            return status
+
+        print(f"[{stage.name}] building: {reason}")
+        inputs = {str(path): file_hash(path) for path in stage.inputs}
+        start = time.perf_counter()
+        incomplete = None
+        try:
+            try:
+                await stage.run()
+            except IncompleteStage as e:
+                incomplete = str(e)
+            missing = [path.name for path in stage.outputs if not path.exists()]
+            if missing:
+                raise RuntimeError(f"did not produce {', '.join(missing)}")
+        except Exception as e:
+            seconds = time.perf_counter() - start
+            print(f"[{stage.name}] failed after {seconds:.1f}s: {e}")
+            self.report[stage.name] = {
+                "status": "failed",
+                "reason": str(e),
+                "seconds": seconds,
+            }
+            return "failed"
+        seconds = time.perf_counter() - start
+        status = "incomplete" if incomplete else "built"
+        print(f"[{stage.name}] {status} in {seconds:.1f}s")
+        self.state[stage.name] = {
+            "params": params_hash(stage.params),
+            "inputs": inputs,
+            "outputs": {str(path): file_hash(path) for path in stage.outputs},
+            "seconds": round(seconds, 3),
+        }
+        if incomplete:
+            # Dependents use the outputs, but this stage runs again next build
+            self.state[stage.name]["incomplete"] = True
+        self._save_state()
+        self.report[stage.name] = {
+            "status": status,
+            "reason": incomplete or reason,
+            "seconds": seconds,
+        }
+        return status
+
+    async def build(
+        self, targets: List[str], force: List[str], dry_run: bool = False
+    ) -> bool:
+        """Build ``targets``; dependencies outside the targets are not rebuilt."""
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.stages:
+            if name in targets:
+                tasks[name] = asyncio.create_task(
+                    self._build(self.stages[name], tasks, force, dry_run)
+                )
+        statuses = await asyncio.gather(*tasks.values())
+        return not any(
+            status in ("failed", "blocked", "incomplete") for status in statuses
+        )
+
+    def summary(self) -> str:
+        rows = [
+            [
+                name,
+                result["status"],
+                f"{result['seconds']:.1f}s" if "seconds" in result else "",
+                result["reason"],
+            ]
+            for name, result in self.report.items()
+        ]
+        return tabulate(rows, headers=["stage", "status", "time", "reason"])
+
+
+def default_index_path() -> Path:
+    if os.getenv("MCP_DATA_PATH"):
+        return Path(os.environ["MCP_DATA_PATH"])
+    return (
+        REPO_ROOT
+        / "baseline"
+        / "mcp_copilot"
+        / "config"
+        / f"mcp_arg_{os.getenv('EMBEDDING_MODEL')}_{os.getenv('ABSTRACT_MODEL')}.json"
+    )
+
+
+def catalog_stages(args) -> List[Stage]:
+    all_config = Path(args.all_config).resolve()
+    catalog_dir = all_config.parent
+    tools_path = Path(args.tools_path or catalog_dir / "tools.json").resolve()
+    clean_config = Path(
+        args.clean_config_path or catalog_dir / "clean_config.json"
+    ).resolve()
+    index_path = Path(args.index_path or default_index_path()).resolve()
+    index_dir = Path(f"{index_path}.{args.quantization}.index")
+    readme_dir = Path(args.readme_dir or catalog_dir / "readme").resolve()
+    crawl_args = shlex.split(args.crawl_args)
+
+    async def build_clean_config():
+        await asyncio.to_thread(create_clean_config, str(all_config), str(clean_config))
+
+    async def crawl_tools():
+        await run_command(
+            sys.executable,
+            "utils/connect_mcp_server.py",
+            "--metadata_path",
+            str(all_config),
+            "--output_path",
+            str(tools_path),
+            *crawl_args,
+        )
+
+    async def build_index():
+        await run_command(
+            sys.executable,
+            "-m",
+            "baseline.mcp_copilot.arg_generation",
+            "--config_path",
+            str(tools_path),
+            "--output_path",
+            str(index_path),
+        )
+
+    async def compile_index():
+        await run_command(
+            sys.executable,
+            "-m",
+            "baseline.mcp_copilot.index_store",
+            str(index_path),
+            "--quantization",
+            args.quantization,
+            "--dimensions",
+            os.getenv("EMBEDDING_DIMENSIONS") or "1024",
+        )
+
+    async def fetch_readmes():
+        await run_command(
+            sys.executable,
+            "tools/crawl_readme.py",
+            "--config_path",
+            str(all_config),
+            "--output_dir",
+            str(readme_dir),
+        )
+
+    return [
+        Stage("clean_config", [all_config], [clean_config], build_clean_config),
+        Stage(
+            "tools",
+            [all_config],
+            [tools_path],
+            crawl_tools,
+            params={"crawl_args": crawl_args},
+        ),
+        Stage(
+            "index",
+            [tools_path],
+            [index_path],
+            build_index,
+            deps=["tools"],
+            params={
+                name: os.getenv(name)
+                for name in (
+                    "EMBEDDING_PROVIDER",
+                    "EMBEDDING_MODEL",
+                    "EMBEDDING_DIMENSIONS",
+                    "ABSTRACT_MODEL",
+                )
+            },
+        ),
+        Stage(
+            "compile",
+            [index_path],
+            [index_dir],
+            compile_index,
+            deps=["index"],
+            params={"quantization": args.quantization},
+        ),
+        Stage("readme", [all_config], [readme_dir], fetch_readmes),
+    ]
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Build the MCP catalog artifacts")
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        help=f"Stages to build: {', '.join(STAGES)} "
+        f"(default: {' '.join(DEFAULT_STAGES)})",
+    )
+    parser.add_argument(
+        "--all_config", type=str, default="./tools/LiveMCPTool/all_config.json"
+    )
+    parser.add_argument("--tools_path", type=str, default=None)
+    parser.add_argument("--clean_config_path", type=str, default=None)
+    parser.add_argument(
+        "--index_path",
+        type=str,
+        default=None,
+        help="Index JSON (default: MCP_DATA_PATH or the copilot's config path)",
+    )
+    parser.add_argument("--readme_dir", type=str, default=None)
+    parser.add_argument(
+        "--quantization", choices=["none", "float16", "int8"], default="none"
+    )
+    parser.add_argument(
+        "--crawl_args",
+        type=str,
+        default="",
+        help="Extra arguments for utils/connect_mcp_server.py",
+    )
+    parser.add_argument(
+        "--force", nargs="*", default=[], help="Stages to rebuild even if up to date"
+    )
+    parser.add_argument(
+        "--dry_run", action="store_true", help="Only report which stages are stale"
+    )
+    args = parser.parse_args()
+    unknown = set(args.stages + args.force) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    all_config = Path(args.all_config).resolve()
+    build = CatalogBuild(catalog_stages(args), all_config.parent / STATE_FILE)
+    start = time.perf_counter()
+    targets = args.stages or DEFAULT_STAGES
+    ok = asyncio.run(build.build(targets, args.force, args.dry_run))
+    print(build.summary())
+    print(f"Total: {time.perf_counter() - start:.1f}s")
+    sys.exit(0 if ok else 1)
@@ -1,61 +1,251 @@
+import argparse
+import asyncio
 import json
-import re
-import requests
 import os
-from tqdm import tqdm
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
 
+import httpx
+from tqdm.asyncio import tqdm
 
-def extract_raw_readme_url(github_url: str) -> str:
+RAW_BASE_URL = "https://raw.githubusercontent.com"
+README_NAMES = ("README.md", "readme.md")
+CACHE_FILE = ".readme_cache.json"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def readme_candidates(github_url: str, raw_base_url: str = RAW_BASE_URL) -> List[str]:
     """
-    将 GitHub 仓库页面链接转换为对应的 raw README.md 地址
+    将 GitHub 仓库页面链接转换为候选的 raw README 地址，按优先级排列
     """
+    raw_base_url = raw_base_url.rstrip("/")
     # 匹配带路径的格式
     pattern_tree = r"https://github\.com/([^/]+)/([^/]+)/tree/([^/]+)/(.*)"
     # 匹配主页面（不带路径）
-    pattern_root = r"https://github\.com/([^/]+)/([^/]+)$"
+    pattern_root = r"https://github\.com/([^/]+)/([^/]+?)/?$"
 
     m1 = re.match(pattern_tree, github_url)
     if m1:
         user, repo, branch, path = m1.groups()
-        return (
-            f"https://raw.githubusercontent.com/{user}/{repo}/{branch}/{path}/README.md"
-        )
+        base = f"{raw_base_url}/{user}/{repo}/{branch}/{path.rstrip('/')}"
+        return [f"{base}/{name}" for name in README_NAMES]
 
     m2 = re.match(pattern_root, github_url)
     if m2:
         user, repo = m2.groups()
-        return f"https://raw.githubusercontent.com/{user}/{repo}/main/README.md"  # 默认分支是 main
+        # 默认分支是 main，其次是 master
+        return [
+            f"{raw_base_url}/{user}/{repo}/{branch}/{name}"
+            for name in README_NAMES
+            for branch in ("main", "master")
+        ]
 
     raise ValueError("Invalid GitHub URL format.")
 
 
-if __name__ == "__main__":
-    with open("./tools/LiveMCPTool/all_config.json", "r") as f:
+def extract_raw_readme_url(github_url: str) -> str:
+    """
+    将 GitHub 仓库页面链接转换为对应的 raw README.md 地址
+    """
+    return readme_candidates(github_url)[0]
+
+
+class ReadmeCache:
+    """Resolved README URL and HTTP validators of every fetched server.
+
+    Stored next to the READMEs so a later run can revalidate each file with
+    a single conditional request (``If-None-Match``/``If-Modified-Since``)
+    instead of downloading and probing again.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Optional[str]]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except json.JSONDecodeError:
+                self.entries = {}
+
+    def get(self, name: str) -> Optional[Dict[str, Optional[str]]]:
+        return self.entries.get(name)
+
+    def update(self, name: str, url: str, response: httpx.Response) -> None:
+        self.entries[name] = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
+
+    def pop(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class ReadmeFetcher:
+    def __init__(
+        self,
+        output_dir: str | Path,
+        raw_base_url: str = RAW_BASE_URL,
+        max_concurrent: int = 32,
+        timeout: float = 30.0,
+        retries: int = 3,
+    ):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.raw_base_url = raw_base_url
+        self.retries = retries
+        self.cache = ReadmeCache(self.output_dir / CACHE_FILE)
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # One pooled client for every request; the semaphore bounds concurrency
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, pool=None),
+            limits=httpx.Limits(
+                max_connections=max_concurrent,
+                max_keepalive_connections=max_concurrent,
+            ),
+            follow_redirects=True,
+        )
+        self.bytes_received = 0
+
+    async def _get(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        for attempt in range(self.retries):
+            try:
+                async with self.semaphore:
+                    response = await self.client.get(url, headers=headers)
+                self.bytes_received += len(response.content)
+                if response.status_code not in RETRY_STATUS:
+                    return response
+            except httpx.TransportError:
+                if attempt == self.retries - 1:
+                    raise
+            if attempt < self.retries - 1:
+                await asyncio.sleep(2**attempt)
+        return response
+
+    def _write(self, name: str, url: str, response: httpx.Response) -> None:
+        path = self.output_dir / f"{name}.md"
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        os.replace(tmp_path, path)
+        self.cache.update(name, url, response)
+
+    async def fetch(self, entry: dict) -> str:
+        """Fetch the README of one server.
+
+        Returns ``unchanged`` (304 on the cached URL), ``updated`` or
+        ``missing`` (every candidate URL returned 404).
+        """
+        name = entry["name"]
+        path = self.output_dir / f"{name}.md"
+        cached = self.cache.get(name)
+        if cached and path.exists():
+            headers = {}
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+            response = await self._get(cached["url"], headers)
+            if response.status_code == 304:
+                return "unchanged"
+            if response.status_code == 200:
+                self._write(name, cached["url"], response)
+                return "updated"
+            if response.status_code != 404:
+                response.raise_for_status()
+            # Moved or renamed; probe the candidates again
+            self.cache.pop(name)
+
+        candidates = readme_candidates(entry["web"], self.raw_base_url)
+        responses = await asyncio.gather(*(self._get(url) for url in candidates))
+        for url, response in zip(candidates, responses):
+            if response.status_code == 200:
+                self._write(name, url, response)
+                return "updated"
+        for response in responses:
+            if response.status_code != 404:
+                response.raise_for_status()
+        return "missing"
+
+    async def fetch_all(self, data: List[dict]) -> Dict[str, List[str]]:
+        async def fetch_one(entry: dict) -> tuple:
+            try:
+                return entry, await self.fetch(entry)
+            except Exception as e:
+                print(f"Error processing {entry.get('web')}: {e}")
+                return entry, "error"
+
+        results: Dict[str, List[str]] = {
+            "updated": [],
+            "unchanged": [],
+            "missing": [],
+            "error": [],
+        }
+        try:
+            tasks = [asyncio.create_task(fetch_one(entry)) for entry in data]
+            for coro in tqdm.as_completed(tasks, total=len(tasks)):
+                entry, status = await coro
+                results[status].append(entry["name"])
+        finally:
+            self.cache.save()
+        return results
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Fetch the README of every server")
+    parser.add_argument(
+        "--config_path", type=str, default="./tools/LiveMCPTool/all_config.json"
+    )
+    parser.add_argument(
+        "--output_dir", type=str, default="./tools/LiveMCPTool/readme"
+    )
+    parser.add_argument(
+        "--raw_base_url",
+        type=str,
+        default=RAW_BASE_URL,
+        help="Base URL serving raw repository files, e.g. a local mirror",
+    )
+    parser.add_argument("--max_concurrent", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    return parser.parse_args()
+
+
+async def main():
+    args = get_args()
+    with open(args.config_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     print(len(data))
-    wrong_entry = []
-    for entry in tqdm(data):
-        url = entry["web"]
-        try:
-            if os.path.exists(f"./tools/LiveMCPTool/readme/{entry['name']}.md"):
-                print(f"Skipping {entry['name']}, already exists.")
-                continue
-            raw_url = extract_raw_readme_url(url)
-            response = requests.get(raw_url)
-            if response.status_code == 404:
-                response = requests.get(raw_url.replace("main", "master"))
-            if response.status_code == 404:
-                response = requests.get(
-                    raw_url.replace("main", "master").replace("README.md", "readme.md")
-                )
-            response.raise_for_status()
-            readme_content = response.text
-            with open(
-                f"./tools/fillter/readme/{entry['name']}.md", "w", encoding="utf-8"
-            ) as f:
-                f.write(readme_content)
-        except Exception as e:
-            print(f"Error processing {url}: {e}")
-            wrong_entry.append(entry)
+    fetcher = ReadmeFetcher(
+        args.output_dir, args.raw_base_url, args.max_concurrent, args.timeout
+    )
+    start = time.perf_counter()
+    try:
+        results = await fetcher.fetch_all(data)
+    finally:
+        await fetcher.aclose()
     print(f"Total entries processed: {len(data)}")
-    print(f"Entries with errors: {len(wrong_entry)}")
+    print(
+        f"Updated: {len(results['updated'])}, unchanged: {len(results['unchanged'])}, "
+        f"missing: {len(results['missing'])}"
+    )
+    print(f"Entries with errors: {len(results['error'])}")
+    print(
+        f"Received {fetcher.bytes_received / 1e6:.2f}MB "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
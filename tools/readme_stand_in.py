@@ -0,0 +1,293 @@
+"""Local stand-in for raw.githubusercontent.com to check crawl_readme.py.
+
+Serves a fixture tree of ``<user>/<repo>/<branch>/<path>`` files over HTTP
+with ``ETag``/``Last-Modified`` validators and ``304`` answers to
+conditional requests, then runs ``crawl_readme.py`` against it through
+``--raw_base_url`` and checks every run:
+
+- cold: each README is found at its highest priority candidate
+  (``README.md`` before ``readme.md``, ``main`` before ``master``),
+  a repository without README is reported missing;
+- warm: each cached README costs one conditional request answered 304;
+- changed: an edited README is downloaded again with one request;
+- moved: a README whose cached URL now returns 404 is re-probed and found
+  at its next candidate.
+
+Usage:
+    python tools/readme_stand_in.py
+    python tools/readme_stand_in.py --serve ./fixtures --port 8000
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Dict, List
+
+CRAWLER = Path(__file__).resolve().parent / "crawl_readme.py"
+
+# Fixture repositories: files under <user>/<repo>/<branch>/, and the GitHub
+# URL crawl_readme.py is given for each server
+FIXTURES = {
+    "alpha": {
+        "web": "https://github.com/acme/alpha",
+        "files": {
+            "main/README.md": "# alpha\n",
+            "main/readme.md": "lower case alpha\n",
+            "master/README.md": "old alpha\n",
+        },
+    },
+    "beta": {
+        "web": "https://github.com/acme/beta",
+        "files": {
+            "main/readme.md": "beta on main\n",
+            "master/README.md": "# beta on master\n",
+        },
+    },
+    "gamma": {
+        "web": "https://github.com/acme/mono/tree/main/src/gamma",
+        "files": {"main/src/gamma/readme.md": "# gamma\n"},
+    },
+    "delta": {
+        "web": "https://github.com/acme/delta",
+        "files": {"main/LICENSE": "MIT\n"},
+    },
+}
+
+
+class RawFileHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with an ETag and 304 answers to conditional requests."""
+
+    def __init__(self, *args, requests: List[tuple], **kwargs):
+        self.requests = requests
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        if not path.is_file():
+            self.requests.append((self.path, 404))
+            self.send_error(404)
+            return None
+        content = path.read_bytes()
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        last_modified = email.utils.formatdate(path.stat().st_mtime, usegmt=True)
+        status = 304 if self.headers.get("If-None-Match") == etag else 200
+        self.requests.append((self.path, status))
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if status == 304:
+            self.end_headers()
+            return None
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        return open(path, "rb")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(root: str | Path, port: int = 0) -> tuple:
+    """Serve ``root`` in a background thread; returns (server, request log)."""
+    requests: List[tuple] = []
+    handler = partial(RawFileHandler, directory=str(root), requests=requests)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests
+
+
+def write_fixtures(root: Path) -> List[dict]:
+    for name, fixture in FIXTURES.items():
+        repo = re.match(r"https://github\.com/([^/]+/[^/]+)", fixture["web"]).group(1)
+        for file, text in fixture["files"].items():
+            path = root / repo / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
+    return [{"name": name, "web": fixture["web"]} for name, fixture in FIXTURES.items()]
+
+
+def crawl(config_path: Path, output_dir: Path, base_url: str) -> Dict[str, int]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(CRAWLER),
+            "--config_path",
+            str(config_path),
+            "--output_dir",
+            str(output_dir),
+            "--raw_base_url",
+            base_url,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    match = re.search(
+        r"Updated: (\d+), unchanged: (\d+), missing: (\d+)", result.stdout
+    )
+    errors = re.search(r"Entries with errors: (\d+)", result.stdout)
+    if not match or not errors:
+        raise RuntimeError(f"Unexpected crawl_readme.py output:\n{result.stdout}")
+    updated, unchanged, missing = map(int, match.groups())
+    return {
+        "updated": updated,
+        "unchanged": unchanged,
+        "missing": missing,
+        "error": int(errors.group(1)),
+    }
+
+
+def check(
+    label: str,
+    counts: Dict[str, int],
+    expected: Dict[str, int],
+    requests: List[tuple],
+    expected_requests: List[tuple] | None = None,
+) -> bool:
+    ok = counts == expected
+    if expected_requests is not None:
+        ok = ok and sorted(requests) == sorted(expected_requests)
+    print(f"{'ok' if ok else 'FAILED'} {label}: {counts}, {len(requests)} requests")
+    if not ok:
+        print(f"  expected {expected}")
+        if expected_requests is not None:
+            print(f"  requests {sorted(requests)}")
+            print(f"  expected {sorted(expected_requests)}")
+    return ok
+
+
+def check_readmes(label: str, output_dir: Path, expected: Dict[str, str]) -> bool:
+    readmes = {
+        name: (output_dir / f"{name}.md").read_text(encoding="utf-8")
+        for name in expected
+    }
+    ok = readmes == expected
+    print(f"{'ok' if ok else 'FAILED'} {label}: {sorted(readmes)}")
+    if not ok:
+        print(f"  got {readmes}\n  expected {expected}")
+    return ok
+
+
+def run_checks() -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        root, output_dir = Path(tmp) / "raw", Path(tmp) / "readme"
+        config_path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps(write_fixtures(root)), encoding="utf-8")
+        server, requests = start_server(root)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        delta_probes = [
+            (f"/acme/delta/{branch}/{name}", 404)
+            for name in ("README.md", "readme.md")
+            for branch in ("main", "master")
+        ]
+        ok = True
+        try:
+            counts = crawl(config_path, output_dir, base_url)
+            ok &= check(
+                "cold run",
+                counts,
+                {"updated": 3, "unchanged": 0, "missing": 1, "error": 0},
+                requests,
+            )
+            ok &= check_readmes(
+                "candidate priority",
+                output_dir,
+                {
+                    "alpha": "# alpha\n",
+                    "beta": "# beta on master\n",
+                    "gamma": "# gamma\n",
+                },
+            )
+
+            requests.clear()
+            ok &= check(
+                "warm run (304)",
+                crawl(config_path, output_dir, base_url),
+                {"updated": 0, "unchanged": 3, "missing": 1, "error": 0},
+                requests,
+                [
+                    ("/acme/alpha/main/README.md", 304),
+                    ("/acme/beta/master/README.md", 304),
+                    ("/acme/mono/main/src/gamma/readme.md", 304),
+                ]
+                + delta_probes,
+            )
+
+            (root / "acme/alpha/main/README.md").write_text(
+                "# alpha v2\n", encoding="utf-8"
+            )
+            requests.clear()
+            ok &= check(
+                "changed file",
+                crawl(config_path, output_dir, base_url),
+                {"updated": 1, "unchanged": 2, "missing": 1, "error": 0},
+                requests,
+                [
+                    ("/acme/alpha/main/README.md", 200),
+                    ("/acme/beta/master/README.md", 304),
+                    ("/acme/mono/main/src/gamma/readme.md", 304),
+                ]
+                + delta_probes,
+            )
+            ok &= check_readmes("changed README", output_dir, {"alpha": "# alpha v2\n"})
+
+            (root / "acme/beta/master/README.md").unlink()
+            requests.clear()
+            ok &= check(
+                "404 re-probe",
+                crawl(config_path, output_dir, base_url),
+                {"updated": 1, "unchanged": 2, "missing": 1, "error": 0},
+                requests,
+                [
+                    ("/acme/alpha/main/README.md", 304),
+                    ("/acme/beta/master/README.md", 404),
+                    ("/acme/beta/main/README.md", 404),
+                    ("/acme/beta/master/README.md", 404),
+                    ("/acme/beta/main/readme.md", 200),
+                    ("/acme/beta/master/readme.md", 404),
+                    ("/acme/mono/main/src/gamma/readme.md", 304),
+                ]
+                + delta_probes,
+            )
+            ok &= check_readmes("moved README", output_dir, {"beta": "beta on main\n"})
+        finally:
+            server.shutdown()
+        return ok
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Check crawl_readme.py against a local raw file server"
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        default=None,
+        help="Only serve this fixture tree, for manual --raw_base_url runs",
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    if args.serve:
+        server, _ = start_server(args.serve, args.port)
+        print(f"Serving {args.serve} at http://127.0.0.1:{server.server_address[1]}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        passed = run_checks()
+        print("All checks passed" if passed else "Some checks failed")
+        sys.exit(0 if passed else 1)
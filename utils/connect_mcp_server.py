@@ -5,9 +5,12 @@ import logging
 import os
 import pathlib
 import re
+import signal
+import sys
+import time
 from contextlib import AsyncExitStack
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.sse import sse_client
@@ -16,6 +19,16 @@ from tqdm.asyncio import tqdm
 
 from my_types import McpServerInfo
 from clogger import _set_logger
+from crawl_scheduler import CrawlScheduler, launcher_type
+from crawl_workers import crawl_with_workers
+from tool_refresh import ChangeLog, RefreshState, merge_entries
+
+logger = logging.getLogger(__name__)
+
+# Exit codes: a crawl that was interrupted or crashed before every server was
+# tried, and a completed crawl in which some servers failed
+EXIT_INTERRUPTED = 1
+EXIT_FAILED_SERVERS = 2
 
 
 class MCPClient:
@@ -193,42 +206,118 @@ class MCPClient:
 
 
 async def process_single_server(
-    server_config: dict, semaphore: asyncio.Semaphore, timeout: int = 30
+    server_config: dict, timeout: float = 30
 ) -> Optional[dict]:
-    # Process a single server with concurrency control
-    async with semaphore:
-        client = MCPClient(timeout=timeout)
-        server_name = server_config.get("name", "unknown")
+    # Process a single server; connecting and listing tools share one deadline
+    client = MCPClient(timeout=timeout)
+    server_name = server_config.get("name", "unknown")
 
-        try:
-            config = server_config["config"]
-            await asyncio.wait_for(client.config_connect(config), timeout=timeout * 2)
+    try:
+        config = server_config["config"]
+        async with asyncio.timeout(timeout):
+            await client.config_connect(config)
             all_info = await client.collect_all_info()
 
-            if all_info:
-                server_config["tools"] = all_info
-                return server_config
-            else:
-                logger.warning(f"No tools found for server {server_name}")
-                return None
-
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout processing server {server_name}")
+        if all_info:
+            server_config["tools"] = all_info
+            return server_config
+        else:
+            logger.warning(f"No tools found for server {server_name}")
             return None
+
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout processing server {server_name}")
+        return None
+    except Exception as e:
+        logger.error(f"Error processing server {server_name}: {e}")
+        return None
+    finally:
+        await client.cleanup()
+
+
+class CrawlJournal:
+    """Append-only JSONL record of finished servers.
+
+    Every server is appended as soon as it finishes, so an interrupted crawl
+    keeps its progress: the next run replays the journal and skips the
+    servers that already succeeded. Once the results are saved to tools.json
+    the journal is removed.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def replay(self) -> tuple:
+        """Return the successful entries and the failed server names."""
+        entries, errors = {}, {}
+        if not self.path.exists():
+            return [], []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a truncated last line
+                    continue
+                name = record["name"]
+                if record.get("entry") is not None:
+                    entries[name] = record["entry"]
+                    errors.pop(name, None)
+                else:
+                    errors[name] = True
+        return list(entries.values()), list(errors)
+
+    def append(self, name: str, entry: Optional[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"name": name, "entry": entry}, ensure_ascii=False))
+            f.write("\n")
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def crawl_server(
+    server_config: dict,
+    scheduler: CrawlScheduler,
+    on_start: Optional[Callable[[str, float], None]] = None,
+) -> tuple:
+    # Keep the server identity with its result, whatever order tasks finish in
+    server_name = server_config.get("name", "unknown")
+    launcher = launcher_type(server_config.get("config", {}))
+    async with scheduler.slot():
+        timeout = scheduler.timeout_for(launcher)
+        if on_start is not None:
+            on_start(server_name, timeout)
+        start = time.monotonic()
+        try:
+            result = await process_single_server(server_config, timeout)
         except Exception as e:
-            logger.error(f"Error processing server {server_name}: {e}")
-            return None
-        finally:
-            await client.cleanup()
+            logger.error(f"Unexpected error processing server {server_name}: {e}")
+            result = None
+        elapsed = time.monotonic() - start
+        scheduler.record(
+            launcher, elapsed, result is not None, result is None and elapsed >= timeout
+        )
+    return server_name, result
 
 
 async def main_parallel(
     servers_data: List[dict],
-    visited_tools: List[str],
+    visited_tools: Set[str],
     max_concurrent: int = 5,
     timeout: int = 30,
     strict: bool = True,
+    journal: Optional[CrawlJournal] = None,
+    scheduler: Optional[CrawlScheduler] = None,
 ) -> tuple:
+    """Crawl the servers not yet visited.
+
+    Results are appended to ``journal`` as they finish instead of being kept
+    in memory. SIGINT/SIGTERM cancel the pending servers and return what has
+    finished so far. Without a ``scheduler`` the crawl uses a fixed
+    ``max_concurrent`` and ``timeout``. Returns the names of the successful
+    and failed servers.
+    """
     # Filter out already visited servers
     servers_to_process = [
         server for server in servers_data if server["name"] not in visited_tools
@@ -242,38 +331,68 @@ async def main_parallel(
         f"Processing {len(servers_to_process)} servers with max {max_concurrent} concurrent connections"
     )
 
-    semaphore = asyncio.Semaphore(max_concurrent)
-    tasks = []
+    if scheduler is None:
+        scheduler = CrawlScheduler(
+            max_concurrent=max_concurrent, timeout=timeout, adaptive=False
+        )
+    scheduler.start()
+    tasks = [
+        asyncio.create_task(crawl_server(server, scheduler))
+        for server in servers_to_process
+    ]
 
-    for server in servers_to_process:
-        task = process_single_server(server, semaphore, timeout)
-        tasks.append(task)
+    loop = asyncio.get_running_loop()
 
-    # Process with progress bar
-    new_data = []
-    error_tools = []
-    for i, coro in enumerate(tqdm.as_completed(tasks), 1):
+    def cancel_pending():
+        logger.warning("Interrupted, cancelling pending servers and saving progress")
+        for task in tasks:
+            task.cancel()
+
+    handled_signals = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            result = await coro
-            server_name = servers_to_process[i - 1]["name"]
+            loop.add_signal_handler(sig, cancel_pending)
+            handled_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass
 
+    # Process with progress bar
+    processed = []
+    error_tools = []
+    cancelled = 0
+    try:
+        for coro in tqdm.as_completed(tasks, total=len(tasks)):
+            try:
+                server_name, result = await coro
+            except asyncio.CancelledError:
+                cancelled += 1
+                continue
+            if journal is not None:
+                journal.append(server_name, result)
             if result is not None:
-                new_data.append(result)
+                processed.append(server_name)
                 logger.info(f"Successfully processed server: {server_name}")
             else:
                 logger.warning(f"Failed to process server: {server_name}")
                 error_tools.append(server_name)
+    finally:
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
+        await scheduler.stop()
+    if scheduler.records:
+        logger.info(scheduler.report())
+    if cancelled:
+        logger.warning(f"Cancelled {cancelled} servers; they will be crawled next run")
 
-        except Exception as e:
-            server_name = (
-                servers_to_process[i - 1]["name"]
-                if i <= len(servers_to_process)
-                else "unknown"
-            )
-            logger.error(f"Unexpected error processing server {server_name}: {e}")
-            error_tools.append(server_name)
+    return processed, error_tools
 
-    return new_data, error_tools
+
+def save_json(path: Path, data: Any) -> None:
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
 
 
 def args_parser():
@@ -286,15 +405,51 @@ def args_parser():
     )
     parser.add_argument(
         "--max_concurrent",
-        default=5,
+        default=32,
         type=int,
         help="Maximum number of concurrent connections",
     )
+    parser.add_argument(
+        "--min_concurrent",
+        default=2,
+        type=int,
+        help="Lower bound when the crawler backs off under load",
+    )
+    parser.add_argument(
+        "--fixed_concurrency",
+        action="store_true",
+        help="Always run max_concurrent connections instead of adapting",
+    )
     parser.add_argument(
         "--timeout",
-        default=180,
+        default=None,
+        type=float,
+        help="Upper bound of the per-server timeout in seconds "
+        "(defaults to the npx/uvx/docker/url launcher profiles)",
+    )
+    parser.add_argument(
+        "--workers",
+        default=0,
         type=int,
-        help="Timeout for each server connection in seconds",
+        help="Crawl in this many worker processes (0 crawls in this process)",
+    )
+    parser.add_argument(
+        "--worker_memory_mb",
+        default=None,
+        type=float,
+        help="Kill a worker whose processes use more resident memory than this",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Also re-crawl servers already in the output whose last crawl is "
+        "older than --refresh_after, replacing only those whose tools changed",
+    )
+    parser.add_argument(
+        "--refresh_after",
+        default=24.0,
+        type=float,
+        help="Age in hours after which --refresh re-crawls a server",
     )
     parser.add_argument(
         "--output_path", type=str, default=None, help="Output path for results"
@@ -302,7 +457,7 @@ def args_parser():
     return parser.parse_args()
 
 
-async def main():
+async def main() -> int:
     args = args_parser()
 
     # Setup logging
@@ -325,10 +480,10 @@ async def main():
             data = json.load(f)
     except FileNotFoundError:
         logger.error(f"Metadata file not found: {root_path}")
-        return
+        return EXIT_INTERRUPTED
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON in metadata file: {e}")
-        return
+        return EXIT_INTERRUPTED
 
     # Load existing results
     new_data = []
@@ -343,20 +498,54 @@ async def main():
         except json.JSONDecodeError:
             logger.warning(f"Invalid JSON in {tools_path}, starting fresh")
             new_data = []
-    # Load visited tools
-    visited_tool = []
-    for entry in new_data:
-        if "name" in entry:
-            visited_tool.append(entry["name"])
-    try:
-        # Process servers in parallel
-        processed_data, error_tools = await main_parallel(
-            data, visited_tool, args.max_concurrent, args.timeout
-        )
 
-        # Update results
-        new_data.extend(processed_data)
+    refresh_state = RefreshState(tools_path.with_suffix(".refresh.json"))
+    change_log = ChangeLog(tools_path.with_suffix(".changes.jsonl"))
+
+    # Replay servers finished by an interrupted run
+    journal = CrawlJournal(tools_path.with_suffix(".journal.jsonl"))
+    journal_entries, _ = journal.replay()
+    if journal_entries:
+        logger.info(f"Recovered {len(journal_entries)} servers from {journal.path}")
+    merge_entries(new_data, journal_entries, refresh_state, change_log)
 
+    # Load visited tools
+    visited_tool = {entry["name"] for entry in new_data if "name" in entry}
+    if args.refresh:
+        configured = {server["name"] for server in data}
+        due = refresh_state.due(
+            visited_tool & configured, max_age=args.refresh_after * 3600
+        )
+        logger.info(f"Refreshing {len(due)} of {len(visited_tool)} crawled servers")
+        visited_tool -= due
+    to_crawl = {server["name"] for server in data if "name" in server} - visited_tool
+    exit_code = EXIT_INTERRUPTED
+    try:
+        # Process servers in parallel; results stream into the journal
+        scheduler_options = {
+            "max_concurrent": args.max_concurrent,
+            "min_concurrent": args.min_concurrent,
+            "timeout": args.timeout,
+            "adaptive": not args.fixed_concurrency,
+        }
+        if args.workers > 0:
+            await crawl_with_workers(
+                data,
+                visited_tool,
+                args.workers,
+                scheduler_options,
+                journal=journal,
+                memory_limit_mb=args.worker_memory_mb,
+            )
+        else:
+            await main_parallel(
+                data,
+                visited_tool,
+                args.max_concurrent,
+                args.timeout,
+                journal=journal,
+                scheduler=CrawlScheduler(**scheduler_options),
+            )
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
     except Exception as e:
@@ -364,22 +553,34 @@ async def main():
     finally:
         # Save results
         try:
-            os.makedirs(tools_path.parent, exist_ok=True)
-            with open(tools_path, "w+", encoding="utf-8") as f:
-                json.dump(new_data, f, ensure_ascii=False, indent=4)
+            journal_entries, error_tools = journal.replay()
+            changes = merge_entries(
+                new_data, journal_entries, refresh_state, change_log
+            )
+            save_json(tools_path, new_data)
+            save_json(refresh_state.path, refresh_state.to_dict())
             if args.output_path:
                 error_tools_path = Path(args.output_path).parent / "error_tools.json"
             else:
                 error_tools_path = root_path.parent / "error_tools.json"
-            with open(error_tools_path, "w+", encoding="utf-8") as f:
-                json.dump(error_tools, f, ensure_ascii=False, indent=4)
+            save_json(error_tools_path, error_tools)
+            journal.remove()
+            crawled = {entry["name"] for entry in journal_entries}
+            untried = to_crawl - crawled - set(error_tools)
+            if untried:
+                logger.warning(f"{len(untried)} servers were not crawled")
+            else:
+                exit_code = EXIT_FAILED_SERVERS if error_tools else 0
             logger.info(
                 f"Successfully processed servers: {len(new_data)}\n"
                 f"Total visited tools: {len(visited_tool)}\n"
+                f"Added {len(changes['added'])}, updated {len(changes['updated'])}, "
+                f"unchanged {len(changes['unchanged'])} (see {change_log.path})\n"
             )
         except Exception as e:
             logger.error(f"Error saving results: {e}")
+    return exit_code
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,230 @@
+"""Adaptive scheduling for the MCP catalog crawler.
+
+- Servers are grouped by launcher (``npx``, ``uvx``, ``docker``, ``url`` or
+  ``other``). Each launcher has a timeout profile; once enough servers of a
+  launcher have connected, its timeout follows the learned spawn latency
+  (EWMA of mean and deviation) instead of the worst-case bound. Timed-out
+  attempts are learned as censored samples at the time they were given, so
+  slow servers raise the timeout instead of being cut off by one learned
+  from fast successes only.
+- Concurrency starts small and follows AIMD: it grows by one while CPU,
+  memory and the recent timeout rate are healthy and halves when any of
+  them is not. Only timeouts count, since servers that fail fast (e.g.
+  missing API keys) do not hold a slot for long.
+- Every outcome is recorded for a per-launcher latency histogram report.
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# (lower bound, upper bound) of the per-server timeout in seconds
+TIMEOUT_PROFILES: Dict[str, Tuple[float, float]] = {
+    "npx": (20, 120),
+    "uvx": (20, 150),
+    "docker": (30, 240),
+    "url": (10, 60),
+    "other": (20, 120),
+}
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 240)
+
+
+def launcher_type(config: dict) -> str:
+    """Launcher of the single server in an ``{"mcpServers": {...}}`` config."""
+    servers = config.get("mcpServers", {})
+    server = next(iter(servers.values()), {}) if servers else {}
+    if server.get("url"):
+        return "url"
+    command = os.path.basename(server.get("command") or "")
+    for launcher in ("npx", "uvx", "docker"):
+        if command == launcher or command.startswith(f"{launcher}."):
+            return launcher
+    return "other"
+
+
+class LatencyModel:
+    """Exponentially weighted spawn latency per launcher."""
+
+    def __init__(self, alpha: float = 0.2, min_samples: int = 5, k: float = 4.0):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.k = k
+        self.mean: Dict[str, float] = {}
+        self.dev: Dict[str, float] = {}
+        self.samples: Dict[str, int] = defaultdict(int)
+
+    def update(self, launcher: str, seconds: float) -> None:
+        self.samples[launcher] += 1
+        if launcher not in self.mean:
+            self.mean[launcher] = seconds
+            self.dev[launcher] = seconds / 2
+            return
+        error = seconds - self.mean[launcher]
+        self.mean[launcher] += self.alpha * error
+        self.dev[launcher] += self.alpha * (abs(error) - self.dev[launcher])
+
+    def timeout(self, launcher: str, bounds: Tuple[float, float]) -> float:
+        low, high = bounds
+        if self.samples[launcher] < self.min_samples:
+            return high
+        learned = self.mean[launcher] + self.k * self.dev[launcher]
+        return min(high, max(low, learned))
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that can change while tasks wait for a slot."""
+
+    def __init__(self, limit: int, min_limit: int = 1, max_limit: int = 64):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(limit, max_limit))
+        self.active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._condition:
+            self.limit = max(self.min_limit, min(limit, self.max_limit))
+            self._condition.notify_all()
+
+
+class CrawlScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        min_concurrent: int = 2,
+        initial_concurrent: int = 4,
+        timeout: Optional[float] = None,
+        adaptive: bool = True,
+        interval: float = 2.0,
+        window: int = 20,
+        cpu_high: float = 90.0,
+        memory_low: float = 10.0,
+        timeout_high: float = 0.5,
+    ):
+        """``timeout`` caps every launcher profile (the old single timeout)."""
+        self.adaptive = adaptive
+        self.limiter = AdaptiveLimiter(
+            initial_concurrent if adaptive else max_concurrent,
+            min_limit=min_concurrent if adaptive else max_concurrent,
+            max_limit=max_concurrent,
+        )
+        self.profiles = {
+            launcher: (
+                (min(low, timeout), min(high, timeout)) if timeout else (low, high)
+            )
+            for launcher, (low, high) in TIMEOUT_PROFILES.items()
+        }
+        self.latency = LatencyModel()
+        self.interval = interval
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.cpu_high = cpu_high
+        self.memory_low = memory_low
+        self.timeout_high = timeout_high
+        self.records: List[Tuple[str, float, bool]] = []
+        self._controller: Optional[asyncio.Task] = None
+
+    def slot(self) -> AdaptiveLimiter:
+        return self.limiter
+
+    def timeout_for(self, launcher: str) -> float:
+        return self.latency.timeout(launcher, self.profiles[launcher])
+
+    def record(
+        self, launcher: str, seconds: float, ok: bool, timed_out: bool = False
+    ) -> None:
+        self.records.append((launcher, seconds, ok))
+        self.outcomes.append(timed_out)
+        # A timeout only says the latency was at least ``seconds``; counting
+        # it at that value still pushes the learned timeout up
+        if ok or timed_out:
+            self.latency.update(launcher, seconds)
+
+    def timeout_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    async def _control(self) -> None:
+        psutil.cpu_percent(interval=None)
+        while True:
+            await asyncio.sleep(self.interval)
+            cpu = psutil.cpu_percent(interval=None)
+            memory_free = 100 - psutil.virtual_memory().percent
+            timeouts = self.timeout_rate()
+            limit = self.limiter.limit
+            if (
+                cpu > self.cpu_high
+                or memory_free < self.memory_low
+                or (len(self.outcomes) >= 5 and timeouts > self.timeout_high)
+            ):
+                limit = limit // 2
+            elif self.limiter.active >= limit:
+                # Only grow while the current slots are all in use
+                limit += 1
+            if limit != self.limiter.limit:
+                await self.limiter.set_limit(limit)
+                logger.debug(
+                    f"Concurrency {self.limiter.limit} (cpu {cpu:.0f}%, "
+                    f"free memory {memory_free:.0f}%, timeouts {timeouts:.0%})"
+                )
+
+    def start(self) -> None:
+        if self.adaptive and self._controller is None:
+            self._controller = asyncio.create_task(self._control())
+
+    async def stop(self) -> None:
+        if self._controller is not None:
+            self._controller.cancel()
+            try:
+                await self._controller
+            except asyncio.CancelledError:
+                pass
+            self._controller = None
+
+    def histogram(self) -> Dict[str, Dict[str, int]]:
+        """Count of outcomes per launcher and latency bucket (upper bound)."""
+        histogram: Dict[str, Dict[str, int]] = {}
+        labels = [f"<={bucket}s" for bucket in HISTOGRAM_BUCKETS] + [
+            f">{HISTOGRAM_BUCKETS[-1]}s"
+        ]
+        for launcher, seconds, _ in self.records:
+            counts = histogram.setdefault(launcher, dict.fromkeys(labels, 0))
+            index = next(
+                (i for i, limit in enumerate(HISTOGRAM_BUCKETS) if seconds <= limit),
+                len(HISTOGRAM_BUCKETS),
+            )
+            counts[labels[index]] += 1
+        return histogram
+
+    def report(self) -> str:
+        lines = ["Crawl latency by launcher:"]
+        for launcher, counts in sorted(self.histogram().items()):
+            records = [record for record in self.records if record[0] == launcher]
+            durations = sorted(seconds for _, seconds, _ in records)
+            ok = sum(1 for _, _, success in records if success)
+            p50 = durations[len(durations) // 2]
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            buckets = " ".join(f"{label}:{n}" for label, n in counts.items() if n)
+            lines.append(
+                f"  {launcher:<6} n={len(durations)} ok={ok} p50={p50:.1f}s "
+                f"p95={p95:.1f}s timeout={self.timeout_for(launcher):.0f}s | {buckets}"
+            )
+        return "\n".join(lines)
+
@@ -0,0 +1,273 @@
+"""Process-isolated crawl workers.
+
+``crawl_with_workers`` splits the servers into one shard per worker process.
+Each worker runs its own event loop and ``CrawlScheduler`` over its shard
+and reports back through a queue; the parent is the only process that
+writes the journal.
+
+Workers run in their own session, so a worker and every MCP server it has
+spawned can be killed together:
+
+- when a server is still running ``KILL_GRACE`` seconds after its timeout
+  (e.g. cleanup hanging in ``exit_stack.aclose()``), and
+- when the resident memory of the worker and its children exceeds
+  ``memory_limit_mb``.
+
+The overdue server is recorded as failed. The other servers that were in
+flight are crawled again by a replacement worker, up to ``MAX_ATTEMPTS``
+attempts each.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import psutil
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
+
+KILL_GRACE = 30.0
+MAX_ATTEMPTS = 2
+POLL_INTERVAL = 0.5
+
+
+def run_worker(
+    worker_id: int,
+    servers: List[dict],
+    messages: multiprocessing.Queue,
+    scheduler_options: Dict[str, Any],
+) -> None:
+    """Entry point of a worker process."""
+    os.setsid()
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(levelname)-4s %(asctime)s [worker {worker_id}] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    asyncio.run(_crawl_shard(servers, messages, scheduler_options))
+
+
+async def _crawl_shard(
+    servers: List[dict],
+    messages: multiprocessing.Queue,
+    scheduler_options: Dict[str, Any],
+) -> None:
+    # Imported here so the parent can import this module from the crawler
+    from connect_mcp_server import crawl_server
+    from crawl_scheduler import CrawlScheduler
+
+    scheduler = CrawlScheduler(**scheduler_options)
+    scheduler.start()
+
+    def on_start(name: str, timeout: float) -> None:
+        messages.put((os.getpid(), "start", name, timeout))
+
+    try:
+        tasks = [
+            asyncio.create_task(crawl_server(server, scheduler, on_start))
+            for server in servers
+        ]
+        for coro in asyncio.as_completed(tasks):
+            name, result = await coro
+            messages.put((os.getpid(), "done", name, result))
+    finally:
+        await scheduler.stop()
+    if scheduler.records:
+        logging.getLogger(__name__).info(scheduler.report())
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    pending: Dict[str, dict]
+    # Server name -> monotonic time after which the worker is killed
+    inflight: Dict[str, float] = field(default_factory=dict)
+
+
+def _tree_rss(pid: int) -> int:
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0
+    rss = 0
+    for proc in processes:
+        try:
+            rss += proc.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss
+
+
+def kill_tree(process: multiprocessing.Process) -> None:
+    """SIGKILL a worker, its session and any child that left the session."""
+    try:
+        children = psutil.Process(process.pid).children(recursive=True)
+    except psutil.NoSuchProcess:
+        children = []
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    for child in children:
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+    process.join(timeout=5)
+
+
+async def crawl_with_workers(
+    servers_data: List[dict],
+    visited_tools: Set[str],
+    workers: int,
+    scheduler_options: Dict[str, Any],
+    journal=None,
+    memory_limit_mb: Optional[float] = None,
+) -> tuple:
+    """Crawl the servers not yet visited in ``workers`` processes.
+
+    ``scheduler_options`` configures the ``CrawlScheduler`` of each worker;
+    ``max_concurrent`` and ``min_concurrent`` are split between the workers.
+    Returns the names of the successful and failed servers.
+    """
+    servers_to_process = [
+        server for server in servers_data if server["name"] not in visited_tools
+    ]
+    if not servers_to_process:
+        logger.info("No new servers to process")
+        return [], []
+    workers = max(1, min(workers, len(servers_to_process)))
+    options = dict(scheduler_options)
+    for key in ("max_concurrent", "min_concurrent"):
+        if key in options:
+            options[key] = max(1, -(-options[key] // workers))
+    logger.info(
+        f"Processing {len(servers_to_process)} servers in {workers} worker "
+        f"processes, max {options.get('max_concurrent')} connections each"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    messages = context.Queue()
+    running: Dict[int, _Worker] = {}
+    worker_ids = itertools.count()
+    attempts: Dict[str, int] = {}
+    processed, error_tools = [], []
+    progress = tqdm(total=len(servers_to_process))
+
+    def spawn(servers: Dict[str, dict]) -> None:
+        if not servers:
+            return
+        process = context.Process(
+            target=run_worker,
+            args=(next(worker_ids), list(servers.values()), messages, options),
+        )
+        process.start()
+        running[process.pid] = _Worker(process, dict(servers))
+
+    def finish(name: str, result: Optional[dict]) -> None:
+        if journal is not None:
+            journal.append(name, result)
+        if result is not None:
+            processed.append(name)
+            logger.info(f"Successfully processed server: {name}")
+        else:
+            error_tools.append(name)
+            logger.warning(f"Failed to process server: {name}")
+        progress.update(1)
+
+    def replace(pid: int, reason: str, failed: List[str]) -> None:
+        worker = running.pop(pid)
+        kill_tree(worker.process)
+        logger.warning(f"Killed worker {pid}: {reason}")
+        for name in failed:
+            worker.pending.pop(name, None)
+            finish(name, None)
+        retry = {}
+        for name, server in worker.pending.items():
+            if name in worker.inflight:
+                attempts[name] = attempts.get(name, 1) + 1
+                if attempts[name] > MAX_ATTEMPTS:
+                    finish(name, None)
+                    continue
+            retry[name] = server
+        spawn(retry)
+
+    for shard in range(workers):
+        spawn(
+            {server["name"]: server for server in servers_to_process[shard::workers]}
+        )
+
+    loop = asyncio.get_running_loop()
+    interrupted = asyncio.Event()
+    handled_signals = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, interrupted.set)
+            handled_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    def next_message():
+        try:
+            return messages.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    last_check = time.monotonic()
+    try:
+        while running and not interrupted.is_set():
+            message = await loop.run_in_executor(None, next_message)
+            if message is not None:
+                pid, kind, name, payload = message
+                worker = running.get(pid)
+                # Late messages from a replaced worker are dropped
+                if worker is not None and name in worker.pending:
+                    if kind == "start":
+                        worker.inflight[name] = (
+                            time.monotonic() + payload + KILL_GRACE
+                        )
+                    else:
+                        worker.pending.pop(name)
+                        worker.inflight.pop(name, None)
+                        finish(name, payload)
+
+            now = time.monotonic()
+            if now - last_check < POLL_INTERVAL:
+                continue
+            last_check = now
+            for pid, worker in list(running.items()):
+                overdue = [name for name, end in worker.inflight.items() if now > end]
+                if overdue:
+                    replace(pid, f"{', '.join(overdue)} did not finish", overdue)
+                elif memory_limit_mb and _tree_rss(pid) > memory_limit_mb * 2**20:
+                    replace(pid, f"memory above {memory_limit_mb:.0f} MB", [])
+                elif not worker.process.is_alive():
+                    if worker.pending:
+                        # Results can still be in the queue; only act once drained
+                        if messages.empty():
+                            replace(
+                                pid,
+                                f"exited with code {worker.process.exitcode}",
+                                [],
+                            )
+                    else:
+                        worker.process.join()
+                        running.pop(pid)
+    finally:
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
+        for worker in running.values():
+            kill_tree(worker.process)
+        progress.close()
+    if interrupted.is_set():
+        logger.warning("Interrupted; unfinished servers will be crawled next run")
+    return processed, error_tools
@@ -1,8 +1,12 @@
+import hashlib
+import json
 import logging
 from openai import OpenAI
+from openai.types.chat import ChatCompletion
 from functools import partial
 from backoff import on_exception, expo
 import os
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +75,74 @@ class ChatModel:
             raise e
 
 
+class CompletionStore:
+    """Append-only JSONL store of chat completion request/response pairs."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.responses = {}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["key"]] = record["response"]
+            logger.info(f"Loaded {len(self.responses)} completions from {self.path}")
+
+    @staticmethod
+    def key(model_name, messages) -> str:
+        payload = json.dumps(
+            {"model": model_name, "messages": messages},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model_name, messages):
+        response = self.responses.get(self.key(model_name, messages))
+        if response is None:
+            return None
+        return ChatCompletion.model_validate(response)
+
+    def put(self, model_name, messages, response):
+        key = self.key(model_name, messages)
+        record = {
+            "key": key,
+            "model": model_name,
+            "messages": messages,
+            "response": response.model_dump(mode="json"),
+        }
+        self.responses[key] = record["response"]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class RecordingChatModel:
+    """Wrap a ChatModel to record completions, or serve them offline in replay mode."""
+
+    def __init__(self, store: CompletionStore, model_name, chat_model=None):
+        if chat_model is None:
+            logger.info("No chat model given, serving completions in replay mode.")
+        self.store = store
+        self.model_name = model_name
+        self.chat_model = chat_model
+
+    @property
+    def replay(self):
+        return self.chat_model is None
+
+    def chat_with_retry(self, message, retry=4):
+        if self.replay:
+            response = self.store.get(self.model_name, message)
+            if response is None:
+                raise KeyError("No recorded completion for this request.")
+            return response
+        response = self.chat_model.chat_with_retry(message=message, retry=retry)
+        self.store.put(self.model_name, message, response)
+        return response
+
+
 if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
@@ -0,0 +1,138 @@
+"""Columnar Parquet store for benchmark results.
+
+Scalar fields (task_id, category, reward, judge, ...) become Parquet columns,
+while nested fields such as ``messages`` are stored as zlib-compressed JSON
+blobs. Readers only decode the columns they are asked for, so a dashboard
+that needs categories and rewards never touches the conversation text.
+
+Requires ``pyarrow``, which is imported lazily.
+
+Usage:
+    python -m utils.results_store ./baseline/output/*.json --to parquet
+"""
+
+import argparse
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+BLOB_COLUMNS_KEY = b"livemcpbench.blob_columns"
+_BATCH_SIZE = 256
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "The Parquet results store requires pyarrow: `uv pip install pyarrow`."
+        ) from e
+    return pa, pq
+
+
+def is_parquet(path: str | Path) -> bool:
+    return Path(path).suffix == ".parquet"
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _encode_blob(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _decode_blob(value: Optional[bytes]) -> Any:
+    if value is None:
+        return None
+    return json.loads(zlib.decompress(value).decode("utf-8"))
+
+
+def write_parquet(path: str | Path, entries: Iterable[Dict[str, Any]]) -> None:
+    """Write entries to a Parquet file, compressing nested fields as blobs."""
+    pa, pq = _import_pyarrow()
+    entries = list(entries)
+    columns: List[str] = []
+    for entry in entries:
+        for key in entry:
+            if key not in columns:
+                columns.append(key)
+    blob_columns = [
+        column
+        for column in columns
+        if not all(_is_scalar(entry.get(column)) for entry in entries)
+    ]
+    arrays = {}
+    for column in columns:
+        values = [entry.get(column) for entry in entries]
+        if column in blob_columns:
+            arrays[column] = pa.array(
+                [None if v is None else _encode_blob(v) for v in values],
+                type=pa.binary(),
+            )
+        else:
+            arrays[column] = pa.array(values)
+    table = pa.table(arrays)
+    table = table.replace_schema_metadata(
+        {BLOB_COLUMNS_KEY: json.dumps(blob_columns).encode("utf-8")}
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def iter_parquet(
+    path: str | Path, columns: Optional[Sequence[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield entries of a Parquet results file, decoding only ``columns``."""
+    _, pq = _import_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.schema_arrow.metadata or {}
+    blob_columns = set(json.loads(metadata.get(BLOB_COLUMNS_KEY, b"[]")))
+    available = parquet_file.schema_arrow.names
+    if columns is not None:
+        columns = [column for column in columns if column in available]
+    for batch in parquet_file.iter_batches(batch_size=_BATCH_SIZE, columns=columns):
+        for row in batch.to_pylist():
+            yield {
+                key: _decode_blob(value) if key in blob_columns else value
+                for key, value in row.items()
+            }
+
+
+def convert(src: str | Path, dst: str | Path) -> None:
+    """Convert a result file between JSON, JSONL and Parquet."""
+    from utils.trajectory_io import iter_results, write_results
+
+    write_results(dst, iter_results(src))
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Convert benchmark result files")
+    parser.add_argument("paths", nargs="+", help="Result files to convert.")
+    parser.add_argument(
+        "--to",
+        choices=["parquet", "json", "jsonl"],
+        default="parquet",
+        help="Target format; the converted file is written next to the source.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    for src in args.paths:
+        src = Path(src)
+        dst = src.with_suffix(f".{args.to}")
+        if dst == src:
+            continue
+        convert(src, dst)
+        print(
+            f"Converted {src} ({src.stat().st_size / 1e6:.2f} MB) -> "
+            f"{dst} ({dst.stat().st_size / 1e6:.2f} MB)"
+        )
@@ -0,0 +1,147 @@
+"""Change detection for re-crawled servers.
+
+A refresh re-lists the tools of servers already in ``tools.json`` once their
+last crawl is older than a given age. Tool lists are compared through a hash
+of their canonical form (name, description and schemas with sorted keys), so
+reordered tools or schema keys are not a change. Only changed entries are
+replaced, and every addition or change is appended to a JSONL change log:
+
+    {"time": "...", "name": "...", "change": "updated",
+     "old_hash": "...", "new_hash": "...",
+     "tools": {"added": [...], "removed": [...], "changed": [...]}}
+
+The time of the last crawl of each server is kept in a separate state file,
+so refreshing an unchanged server does not touch its entry.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+CANONICAL_FIELDS = ("name", "description", "inputSchema", "outputSchema")
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def tool_hashes(entry: dict) -> Dict[str, str]:
+    """Hash of every tool of a tools.json entry, by tool name."""
+    hashes = {}
+    for info in (entry.get("tools") or {}).values():
+        for tool in info.get("tools") or []:
+            canonical = {
+                field: tool[field]
+                for field in CANONICAL_FIELDS
+                if tool.get(field) is not None
+            }
+            digest = hashlib.sha256(canonical_json(canonical).encode("utf-8"))
+            hashes[tool["name"]] = digest.hexdigest()[:16]
+    return hashes
+
+
+def tools_hash(entry: dict) -> str:
+    """Hash of the canonical tool list of a tools.json entry."""
+    digest = hashlib.sha256(canonical_json(tool_hashes(entry)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def diff_tools(old: Optional[dict], new: dict) -> Dict[str, List[str]]:
+    old_hashes = tool_hashes(old) if old else {}
+    new_hashes = tool_hashes(new)
+    return {
+        "added": sorted(new_hashes.keys() - old_hashes.keys()),
+        "removed": sorted(old_hashes.keys() - new_hashes.keys()),
+        "changed": sorted(
+            name
+            for name in new_hashes.keys() & old_hashes.keys()
+            if new_hashes[name] != old_hashes[name]
+        ),
+    }
+
+
+class ChangeLog:
+    """Append-only JSONL log of added and changed servers."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def append(self, name: str, old: Optional[dict], new: dict) -> None:
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "name": name,
+            "change": "updated" if old else "added",
+            "old_hash": tools_hash(old) if old else None,
+            "new_hash": tools_hash(new),
+            "tools": diff_tools(old, new),
+        }
+        os.makedirs(self.path.parent, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+
+
+class RefreshState:
+    """Time of the last successful crawl of every server."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.crawled_at: Dict[str, float] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.crawled_at = json.load(f)
+            except json.JSONDecodeError:
+                self.crawled_at = {}
+
+    def touch(self, name: str, when: Optional[float] = None) -> None:
+        self.crawled_at[name] = time.time() if when is None else when
+
+    def due(self, names: Iterable[str], max_age: float) -> Set[str]:
+        """Servers never crawled with this state, or crawled over ``max_age`` ago."""
+        now = time.time()
+        return {
+            name
+            for name in names
+            if now - self.crawled_at.get(name, 0.0) >= max_age
+        }
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(sorted(self.crawled_at.items()))
+
+
+def merge_entries(
+    entries: List[dict],
+    crawled: Iterable[dict],
+    state: RefreshState,
+    change_log: ChangeLog,
+) -> Dict[str, List[str]]:
+    """Merge freshly crawled entries into ``entries`` in place.
+
+    New servers are appended and servers whose tools changed are replaced;
+    unchanged entries are left as they are. Returns the names by outcome.
+    """
+    positions = {entry["name"]: i for i, entry in enumerate(entries) if "name" in entry}
+    summary = {"added": [], "updated": [], "unchanged": []}
+    now = time.time()
+    for entry in crawled:
+        name = entry["name"]
+        state.touch(name, now)
+        if name not in positions:
+            positions[name] = len(entries)
+            entries.append(entry)
+            change_log.append(name, None, entry)
+            summary["added"].append(name)
+            continue
+        old = entries[positions[name]]
+        if tools_hash(old) == tools_hash(entry):
+            summary["unchanged"].append(name)
+            continue
+        entries[positions[name]] = entry
+        change_log.append(name, old, entry)
+        summary["updated"].append(name)
+    return summary
@@ -0,0 +1,199 @@
+"""Streaming readers and writers for benchmark result files.
+
+Result files are either a JSON array (the historical ``indent=4`` format),
+JSONL with one entry per line, or a Parquet file (see ``utils.results_store``).
+Readers yield one entry at a time and can project only the fields a consumer
+needs, so aggregating over large sweeps does not keep every ``messages``
+history in memory.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from utils.results_store import is_parquet, iter_parquet, write_parquet
+
+_CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+# Fields that are derived from ``messages`` when they are not stored directly.
+DERIVED_FIELDS = ("tool_calls",)
+
+
+def is_jsonl(path: str | Path) -> bool:
+    return Path(path).suffix == ".jsonl"
+
+
+def _iter_json_array(f, chunk_size: int = _CHUNK_SIZE) -> Iterator[Any]:
+    """Incrementally decode the elements of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    read_size = chunk_size
+    state = "start"
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                break
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = chunk, 0
+            continue
+
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValueError("Result file must contain a JSON array.")
+            pos += 1
+            state = "first"
+        elif state == "sep":
+            if char == ",":
+                pos += 1
+                state = "value"
+            elif char == "]":
+                return
+            else:
+                raise ValueError(f"Unexpected character {char!r} in JSON array.")
+        else:
+            if char == "]" and state == "first":
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+                # A scalar ending exactly at the buffer edge may be truncated.
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # Grow the read size so very large entries decode in O(log n) passes.
+                chunk = f.read(read_size)
+                read_size *= 2
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            read_size = chunk_size
+            pos = end
+            state = "sep"
+            yield obj
+    raise ValueError("Unexpected end of JSON array.")
+
+
+def extract_tool_calls(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the ``execute-tool`` calls of a trajectory in call order."""
+    tool_calls = []
+    for message in messages:
+        if message.get("role") != "assistant":
+            continue
+        calls = message.get("tool_calls") or message.get("function_call") or []
+        if isinstance(calls, dict):
+            calls = [{"function": calls}]
+        for tool_call in calls:
+            function = tool_call.get("function", {})
+            if function.get("name") != "execute-tool":
+                continue
+            arguments = function.get("arguments", "")
+            try:
+                tool_config = json.loads(arguments)
+            except (json.JSONDecodeError, TypeError):
+                tool_config = {}
+            if not isinstance(tool_config, dict):
+                tool_config = {}
+            tool_calls.append(
+                {
+                    "server_name": tool_config.get("server_name", "not_given"),
+                    "tool_name": tool_config.get("tool_name", "not_given"),
+                    "params": tool_config.get("params"),
+                    "arguments": arguments,
+                }
+            )
+    return tool_calls
+
+
+def project(entry: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only ``fields`` of an entry, deriving ``tool_calls`` if needed."""
+    if fields is None:
+        return entry
+    projected = {}
+    for field in fields:
+        if field in entry:
+            projected[field] = entry[field]
+        elif field == "tool_calls" and "messages" in entry:
+            projected[field] = extract_tool_calls(entry["messages"])
+    return projected
+
+
+def iter_results(
+    path: str | Path, fields: Optional[Sequence[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield the entries of a result file one at a time."""
+    path = Path(path)
+    if is_parquet(path):
+        columns = None
+        if fields is not None:
+            columns = list(fields)
+            if any(field in DERIVED_FIELDS for field in fields):
+                columns.append("messages")
+        for entry in iter_parquet(path, columns=columns):
+            yield project(entry, fields)
+        return
+    with path.open("r", encoding="utf-8") as f:
+        if is_jsonl(path):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield project(json.loads(line), fields)
+        else:
+            for entry in _iter_json_array(f):
+                yield project(entry, fields)
+
+
+def load_results(path: str | Path) -> List[Dict[str, Any]]:
+    return list(iter_results(path))
+
+
+def read_task_ids(path: str | Path) -> Set[str]:
+    """Collect the task ids of a result file, or an empty set if it is missing."""
+    if not Path(path).exists():
+        return set()
+    return {entry["task_id"] for entry in iter_results(path, fields=("task_id",))}
+
+
+def write_results(path: str | Path, entries: Iterable[Dict[str, Any]]) -> None:
+    """Write entries to ``path`` atomically, streaming them one at a time.
+
+    ``entries`` may lazily read from ``path`` itself, since the new content is
+    written to a temporary file that replaces the target only when complete.
+    """
+    path = Path(path)
+    if is_parquet(path):
+        write_parquet(path, entries)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        if is_jsonl(path):
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        else:
+            f.write("[")
+            for i, entry in enumerate(entries):
+                text = json.dumps(entry, indent=4, ensure_ascii=False)
+                f.write(("," if i else "") + "\n    " + text.replace("\n", "\n    "))
+            f.write("\n]")
+    os.replace(tmp_path, path)
+
+
+def append_results(path: str | Path, entries: Iterable[Dict[str, Any]]) -> None:
+    """Append entries to a JSONL result file."""
+    path = Path(path)
+    if not is_jsonl(path):
+        raise ValueError(f"Only JSONL result files can be appended to: {path}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")